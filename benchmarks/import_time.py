@@ -0,0 +1,74 @@
+'''
+Measure the start-up cost of hsitools in fresh interpreters.
+
+Each scenario is run in a new Python process, as a batch worker spawned per file would be.
+The wall time, the peak memory and whether OpenCV and matplotlib were loaded are reported,
+together with the slowest packages from python -X importtime.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 5] [--top 5]
+'''
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+SCENARIOS = {
+    'import hsitools': 'import hsitools',
+    'convert.nh9_to_array': 'import hsitools; hsitools.convert.nh9_to_array',
+    'preprocessing': 'import hsitools; hsitools.preprocessing.std',
+    'correction.hsi_blur': 'import hsitools; hsitools.correction.hsi_blur',
+    'visualize': 'import hsitools; hsitools.visualize.plot_spectral_graph',
+    'all subpackages': 'import hsitools; [getattr(hsitools, name) for name in hsitools.SUBPACKAGES]',
+}
+
+REPORT = ('import resource, sys; '
+          'print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "cv2" in sys.modules, "matplotlib" in sys.modules)')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code, importtime=False):
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code + '; ' + REPORT]
+    environment = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, env=environment, check=True)
+    return time.perf_counter() - start, result.stdout.split(), result.stderr
+
+
+def slowest_imports(stderr, top):
+    # Lines look like "import time: self [us] | cumulative | imported package", nested imports being indented.
+    imports = []
+    for line in stderr.splitlines():
+        fields = line.split('|')
+        if line.startswith('import time:') and fields[1].strip().isdigit():
+            name = fields[2].strip()
+            if '.' not in name and name != 'hsitools':
+                imports.append((int(fields[1]), name))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='number of processes per scenario')
+    parser.add_argument('--top', type=int, default=5, help='number of slowest packages shown')
+    args = parser.parse_args()
+
+    baseline = min(run('pass')[0] for _ in range(args.repeat))
+    print('interpreter start-up: %.1f ms' % (baseline * 1e3))
+    print('%-24s %10s %10s %6s %11s' % ('scenario', 'time [ms]', 'RSS [MB]', 'cv2', 'matplotlib'))
+    for name, code in SCENARIOS.items():
+        times = []
+        for _ in range(args.repeat):
+            elapsed, (max_rss, has_cv2, has_matplotlib), _ = run(code)
+            times.append(elapsed)
+        print('%-24s %10.1f %10.1f %6s %11s' % (name, (min(times) - baseline) * 1e3, int(max_rss) / 1024, has_cv2, has_matplotlib))
+
+    print('\nslowest packages (cumulative) for "all subpackages":')
+    for cumulative, module in slowest_imports(run(SCENARIOS['all subpackages'], importtime=True)[2], args.top):
+        print('  %-30s %8.1f ms' % (module, cumulative / 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,15 @@
-from .convert import __init__
-from .correction import __init__
-from .machine_learning import __init__
-from .preprocessing import __init__
-from .visualize import __init__
\ No newline at end of file
+import importlib as _importlib
+
+# Subpackages are imported on first access, so that `import hsitools` does not load OpenCV or matplotlib.
+SUBPACKAGES = ('convert', 'correction', 'detection', 'machine_learning', 'monitoring', 'preprocessing', 'segmentation', 'unmixing', 'utils', 'visualize')
+__all__ = list(SUBPACKAGES)
+
+
+def __getattr__(name):
+    if name in SUBPACKAGES:
+        return _importlib.import_module('.' + name, __name__)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(SUBPACKAGES))
\ No newline at end of file
@@ -1,3 +1,5 @@
-from .nh9_to_array import nh9_to_array
+from .nh9_to_array import nh9_to_array, nh9_to_memmap
 from .hs_to_rgb import *
-from .extract_pxels_from_hsi import extract_pixels_from_hsi, extract_pixels_from_hsi_mask
\ No newline at end of file
+from .extract_pxels_from_hsi import extract_pixels_from_hsi, extract_pixels_from_hsi_mask, extract_pixels_from_hsi_regions
+from .band_math import band_math
+from .resample import resampling_matrix, resample_spectra
\ No newline at end of file
@@ -0,0 +1,82 @@
+import ast
+import re
+import numpy as np
+
+BAND_PATTERN = re.compile(r'R(\d+(?:\.\d+)?)')
+
+FUNCTIONS = {'sqrt': np.sqrt, 'log': np.log, 'exp': np.exp, 'abs': np.abs, 'minimum': np.minimum, 'maximum': np.maximum}
+
+ALLOWED_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.Constant,
+                 ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd)
+
+
+def band_math(hsi: np.array, expressions: dict, wavelengths: np.array=None, lower_limit_wavelength: int=350, spectrum_stepsize: int=5, chunk_rows: int=64, out: np.array=None):
+    '''
+    Evaluate spectral indices given as band-math expressions over wavelengths.
+
+    Bands are referenced as R<wavelength in nm>, e.g. '(R800 - R670) / (R800 + R670)'.
+    The operators + - * / ** and the functions sqrt, log, exp, abs, minimum and maximum can be used.
+    Every band needed by any expression is gathered only once per chunk of rows,
+    and all expressions are evaluated on it in float32.
+
+    Parameters:
+        hsi (np.array): hyperspectral image (height, width, band)
+        expressions (dict): Index names mapped to band-math expressions.
+        wavelengths (np.array, optional): Wavelength of each band. If None, a uniform grid starting at lower_limit_wavelength is assumed.
+        lower_limit_wavelength (int): lower limit wavelength of hsi
+        spectrum_stepsize (int): wavelength range between hsi channels
+        chunk_rows (int): Number of rows processed at once. Default is 64.
+        out (np.array, optional): Output array (height, width, number of expressions). If None, a float32 array is allocated.
+
+    Returns:
+        np.array: Index cube (height, width, number of expressions) in the order of expressions.
+    '''
+    height, width, band_size = hsi.shape
+    if wavelengths is None:
+        wavelengths = lower_limit_wavelength + spectrum_stepsize * np.arange(band_size)
+    wavelengths = np.asarray(wavelengths, dtype=np.float64)
+
+    programs, band_index = _compile_expressions(expressions, wavelengths)
+
+    if out is None:
+        out = np.empty((height, width, len(programs)), dtype=np.float32)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for start in range(0, height, chunk_rows):
+            chunk = hsi[start:start + chunk_rows][:, :, band_index]
+            bands = np.array(np.moveaxis(chunk, 2, 0), dtype=np.float32, order='C')
+            namespace = dict(FUNCTIONS)
+            namespace.update({'_band%d' % k: band for k, band in enumerate(bands)})
+            for i, program in enumerate(programs):
+                out[start:start + chunk_rows, :, i] = eval(program, {'__builtins__': {}}, namespace)
+    return out
+
+
+def _compile_expressions(expressions, wavelengths):
+    tolerance = np.min(np.diff(wavelengths)) / 2 if len(wavelengths) > 1 else 0.5
+    band_index = []
+
+    def to_variable(match):
+        wavelength = float(match.group(1))
+        band = int(np.argmin(np.abs(wavelengths - wavelength)))
+        if abs(wavelengths[band] - wavelength) > tolerance:
+            raise ValueError('Wavelength %s nm is outside the band grid of the image.' % match.group(1))
+        if band not in band_index:
+            band_index.append(band)
+        return '_band%d' % band_index.index(band)
+
+    programs = []
+    for name, expression in expressions.items():
+        # Band variables are named _band<k>, so names typed by the user can never start with an underscore.
+        if '_' in expression:
+            raise ValueError('Unsupported character _ in expression %s: %s' % (name, expression))
+        tree = ast.parse(BAND_PATTERN.sub(to_variable, expression), mode='eval')
+        for node in ast.walk(tree):
+            if not isinstance(node, ALLOWED_NODES):
+                raise ValueError('Unsupported syntax in expression %s: %s' % (name, expression))
+            if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS):
+                raise ValueError('Unsupported function in expression %s: %s' % (name, expression))
+            if isinstance(node, ast.Name) and not (node.id in FUNCTIONS or re.fullmatch(r'_band\d+', node.id)):
+                raise ValueError('Unknown name %s in expression %s: %s' % (node.id, name, expression))
+        programs.append(compile(tree, '<band_math:%s>' % name, 'eval'))
+    return programs, np.array(band_index, dtype=np.intp)
@@ -1,6 +1,9 @@
 import numpy as np
 
-def extract_pixels_from_hsi(hsi: np.array, area: np.array):
+from ..utils.rle import rle_to_flat_index
+from ..utils.buffer_pool import prepare_output
+
+def extract_pixels_from_hsi(hsi: np.array, area: np.array, out: np.array=None, dtype=None):
     '''
     Extract pixels from a hyperspectral image (HSI) within the specified area.
 
@@ -8,21 +11,56 @@ def extract_pixels_from_hsi(hsi: np.array, area: np.array):
         hsi (np.array): Input hyperspectral image.
         area (np.array): Array specifying the area of interest in the image.
             Format: [start_row, start_column, end_row, end_column]
+        out (np.array, optional): Output array (number of pixels in the area, band). Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is None (same as hsi).
 
     Returns:
         np.array: Extracted pixels within the specified area.
     '''
-    return hsi[area[0]:area[2], area[1]:area[3], :].reshape(-1, hsi.shape[2])
+    area_hsi = hsi[area[0]:area[2], area[1]:area[3], :]
+    if out is None and dtype is None:
+        return area_hsi.reshape(-1, hsi.shape[2])
+    out = prepare_output(out, (area_hsi.shape[0] * area_hsi.shape[1], hsi.shape[2]), dtype or hsi.dtype)
+    np.copyto(out.reshape(area_hsi.shape), area_hsi, casting='unsafe')
+    return out
 
-def extract_pixels_from_hsi_mask(hsi: np.array, mask_img: np.array):
+def extract_pixels_from_hsi_mask(hsi: np.array, mask_img: np.array, mask_value: int=255, out: np.array=None, dtype=None):
     '''
-    Extract pixels from a hyperspectral image (HSI) using a binary mask.
+    Extract pixels from a hyperspectral image (HSI) using a mask.
 
     Parameters:
         hsi (np.array): Input hyperspectral image.
-        mask_img (np.array): Binary mask image where 255 indicates regions of interest.
+        mask_img (np.array): Mask image where mask_value indicates regions of interest. A label image can be used as well.
+        mask_value (int, optional): Value of the regions of interest in the mask. Default is 255.
+        out (np.array, optional): Output array (number of pixels in the mask, band). Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is None (same as hsi).
 
     Returns:
         np.array: Extracted pixels from the HSI corresponding to the regions specified by the mask.
     '''
-    return hsi[mask_img == 255]
+    rows, cols = np.nonzero(mask_img == mask_value)
+    if out is None and dtype is None:
+        return hsi[rows, cols]
+    out = prepare_output(out, (len(rows), hsi.shape[2]), dtype or hsi.dtype)
+    np.copyto(out, hsi[rows, cols], casting='unsafe')
+    return out
+
+def extract_pixels_from_hsi_regions(hsi: np.array, regions: dict):
+    '''
+    Extract pixels from a hyperspectral image (HSI) for every region of a region table.
+
+    Only the pixels inside each region are gathered, without building full-size masks.
+
+    Parameters:
+        hsi (np.array): Input hyperspectral image.
+        regions (dict): Region table from hsitools.segmentation.segment_regions().
+
+    Returns:
+        list of np.array: Extracted pixels of each region. shape=(number of pixels in the region, band)
+    '''
+    pixels_list = []
+    for bbox, rle in zip(regions['bbox'], regions['rle']):
+        flat_index = rle_to_flat_index(rle)
+        bbox_width = bbox[3] - bbox[1]
+        pixels_list.append(hsi[bbox[0] + flat_index // bbox_width, bbox[1] + flat_index % bbox_width])
+    return pixels_list
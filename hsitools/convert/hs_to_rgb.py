@@ -1,65 +1,93 @@
 import os
 import numpy as np
 
-def hs_to_rgb(hsi: np.array, lower_limit_wavelength: int=350, upper_limit_wavelength: int=1100, spectrum_stepsize: int=5, color_matching_function: np.array = None, gamma = None):
+from ..utils.buffer_pool import prepare_output
+from .resample import resampling_matrix, describe_grid
+
+def hs_to_rgb(hsi: np.array, lower_limit_wavelength: int=350, upper_limit_wavelength: int=1100, spectrum_stepsize: int=5, color_matching_function: np.array = None, gamma = None, out: np.array=None, dtype=np.float32, chunk_rows: int=64, wavelengths: np.array=None):
     '''
     Parameters:
         hsi (np.array): hyperspectral image (height, width, band)
         lower_limit_wavelength (int): lower limit wavelength of hsi
         upper_limit_wavelength (int): upper_limit_wavelength of hsi
         spectrum_stemsize (int): wavelength range between hsi channels
-        color_matching_function (np.array): color matching function
+        color_matching_function (np.array): color matching function (wavelength, x, y, z). It is interpolated onto the wavelengths of hsi.
         gamma (float): Specify the gamma correction value if gamma correction is to be applied．The input image must have a value range of 0 to 1 in this case．
+        out (np.array): output array (height, width, 3). If gamma is specified, it receives the gamma corrected uint8 image.
+        dtype (np.dtype): data type of the output when out is None and gamma is not specified
+        chunk_rows (int): number of rows converted at once
+        wavelengths (np.array): wavelength of each hsi channel. If None, the uniform grid given by lower_limit_wavelength, upper_limit_wavelength and spectrum_stepsize is used.
 
     Returns:
         np.array: NumPy array of RGB images converted from hyperspectral images
     '''
 
-    hsi = hsi.astype(np.float32)
     height, width = hsi.shape[0], hsi.shape[1]
 
-    if color_matching_function == None:
+    if color_matching_function is None:
         color_matching_function = get_10_deg_XYZ_CMFs()
-        color_matching_function = color_matching_function[::spectrum_stepsize] 
-
-    wave_length = np.arange(lower_limit_wavelength, upper_limit_wavelength + 1, spectrum_stepsize)
-
-    index_low, index_hight = int(np.where(wave_length == color_matching_function[0, 0])[0]), int(np.where(wave_length == color_matching_function[-1, 0])[0]) + 1
 
-    hsi_cie_range = hsi[:, :, index_low : index_hight]
+    if wavelengths is None:
+        wavelengths = np.arange(lower_limit_wavelength, upper_limit_wavelength + 1, spectrum_stepsize)
+    wavelengths = np.asarray(wavelengths, dtype=np.float64)
 
-    img_xyz = np.zeros((height, width, 3))
-    img_rgb = np.zeros((height, width, 3))
+    # Channels outside the color matching function do not contribute.
+    inside = np.flatnonzero((wavelengths >= color_matching_function[0, 0]) & (wavelengths <= color_matching_function[-1, 0]))
+    if len(inside) == 0:
+        raise ValueError('No band of hsi is inside the range of the color matching function. hsi: %s, color matching function: %s'
+                         % (describe_grid(wavelengths), describe_grid(color_matching_function[:, 0])))
+    index_low, index_hight = inside[0], inside[-1] + 1
+    cmf_on_grid = resampling_matrix(color_matching_function[:, 0], wavelengths[index_low:index_hight]).T @ color_matching_function[:, 1:]
 
     M = np.array([[0.41844, -0.15866, -0.08283],
                   [-0.09117, 0.25242, 0.01570],
                   [0.00092, -0.00255, 0.17858]])
-    
-    intensity = hsi_cie_range.reshape(-1, index_hight - index_low)
-    
-    xyz = np.dot(intensity, color_matching_function[:, 1:])
 
-    img_xyz = xyz.reshape(height, width, 3)
+    # XYZ conversion and the XYZ to RGB matrix are fused into a single (band, 3) projection.
+    projection = np.dot(cmf_on_grid, M.T).astype(np.float32)
+
+    if gamma != None:
+        img_rgb = np.empty((height, width, 3), dtype=np.float32)
+    else:
+        img_rgb = prepare_output(out, (height, width, 3), dtype)
 
-    img_rgb = np.dot(img_xyz, M.T)
+    for start in range(0, height, chunk_rows):
+        intensity = hsi[start:start + chunk_rows, :, index_low : index_hight].astype(np.float32)
+        if img_rgb.dtype == np.float32 and img_rgb.flags.c_contiguous:
+            np.dot(intensity, projection, out=img_rgb[start:start + chunk_rows])
+        else:
+            np.copyto(img_rgb[start:start + chunk_rows], np.dot(intensity, projection), casting='unsafe')
 
     if gamma != None:
-        img_rgb_gamma  = gamma_correction(img_rgb, gamma=gamma, max_value=1.0)
+        img_rgb_gamma  = gamma_correction(img_rgb, gamma=gamma, max_value=1.0, out=out)
         return img_rgb_gamma
     else:
         return img_rgb
 
-def gamma_correction(img: np.array, gamma: float=2.2, max_value: int=65535, base_max_value: int=255):
-    
-    img = img.astype(np.float32) / max_value
-    img = img ** (1.0 / gamma)
-    img = img * base_max_value
-    if base_max_value == 255:
-        img = img.astype(np.uint8)
-    elif base_max_value == 65535:
-        img = img.astype(np.uint16)
+def gamma_correction(img: np.array, gamma: float=2.2, max_value: int=65535, base_max_value: int=255, out: np.array=None, dtype=None):
+    '''
+    Parameters:
+        img (np.array): input image
+        gamma (float): gamma value
+        max_value (int): maximum value of the input image
+        base_max_value (int): maximum value of the output image. 255 gives a uint8 image and 65535 a uint16 image.
+        out (np.array): output array of the same shape as img
+        dtype (np.dtype): data type of the output when out is None. By default it follows base_max_value, otherwise float32.
+
+    Returns:
+        np.array: gamma corrected image
+    '''
+    if dtype is None:
+        dtype = {255: np.uint8, 65535: np.uint16}.get(base_max_value, np.float32)
+    out = prepare_output(out, img.shape, dtype)
 
-    return img
+    work = out if out.dtype == np.float32 else np.empty(img.shape, dtype=np.float32)
+    np.divide(img, max_value, out=work, casting='unsafe')
+    np.power(work, 1.0 / gamma, out=work)
+    work *= base_max_value
+    if work is not out:
+        np.copyto(out, work, casting='unsafe')
+    return out
 
 def get_10_deg_XYZ_CMFs():
     array = np.array((390,2.952420E-03,4.076779E-04,1.318752E-02,
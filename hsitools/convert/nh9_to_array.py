@@ -17,4 +17,19 @@ def nh9_to_array(file_path: str, height=1080, width=2048, spectral_dimension=151
         hsi_np_array = np.reshape(hs_array, (height, spectral_dimension, width))
         hsi_np_array = np.transpose(hsi_np_array, (0, 2, 1))
         
-    return hsi_np_array
\ No newline at end of file
+    return hsi_np_array
+
+def nh9_to_memmap(file_path: str, height=1080, width=2048, spectral_dimension=151) -> np.array:
+    '''
+    Parameters:
+        file_path (str): Path to the hyperspectral image file.
+        height (int): Height of the image.
+        width (int): Width of the image.
+        spectral_dimension (int): Number of spectral dimensions.
+
+    Returns:
+        np.array: Read-only memory-mapped view (height, width, spectral_dimension) of the hyperspectral image data.
+            Only the parts that are accessed are read from the file.
+    '''
+    hs_memmap = np.memmap(file_path, np.uint16, mode='r', shape=(height, spectral_dimension, width))
+    return np.transpose(hs_memmap, (0, 2, 1))
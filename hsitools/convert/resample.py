@@ -0,0 +1,149 @@
+from functools import lru_cache
+import numpy as np
+
+from ..utils.buffer_pool import prepare_output
+
+METHODS = ('linear', 'cubic', 'gaussian')
+
+
+def resampling_matrix(source_wavelengths: np.array, target_wavelengths: np.array, method: str='linear', fwhm: np.array=None):
+    '''
+    Build the weight matrix that resamples spectra from one band grid to another.
+
+    Matrices are cached per pair of band grids, so building them again for every frame is free.
+    Target bands outside the source grid take the value of the nearest source band for 'linear' and 'cubic'.
+
+    Parameters:
+        source_wavelengths (np.array): Center wavelength of each source band, in ascending order.
+        target_wavelengths (np.array): Center wavelength of each target band.
+        method (str): Resampling method. Default is 'linear'.
+            'linear': linear interpolation
+            'cubic': natural cubic spline interpolation
+            'gaussian': convolution with a Gaussian spectral response function (SRF) of each target band
+        fwhm (np.array, optional): Full width at half maximum of each target band for 'gaussian'.
+            If None, the spacing of the target grid is used.
+
+    Returns:
+        np.array: Read-only weight matrix (source band, target band). Resampled spectra are spectra @ matrix.
+    '''
+    if method not in METHODS:
+        raise ValueError('method must be one of %s' % (METHODS,))
+    if fwhm is not None:
+        fwhm = tuple(np.broadcast_to(np.asarray(fwhm, dtype=np.float64), np.shape(target_wavelengths)).tolist())
+    return _cached_resampling_matrix(tuple(np.asarray(source_wavelengths, dtype=np.float64).tolist()),
+                                     tuple(np.asarray(target_wavelengths, dtype=np.float64).tolist()), method, fwhm)
+
+
+def resample_spectra(hsi: np.array, source_wavelengths: np.array, target_wavelengths: np.array, method: str='linear', fwhm: np.array=None,
+                     tile_pixels: int=131072, out: np.array=None, dtype=np.float32):
+    '''
+    Resample a hyperspectral image (HSI) or hyperspectral pixels onto another band grid.
+
+    Only the source bands with a non-zero weight are read, and each chunk is projected with a single matrix product.
+
+    Parameters:
+        hsi (np.array): Hyperspectral image (height, width, band) or pixels (number of data, band).
+        source_wavelengths (np.array): Center wavelength of each band of hsi, in ascending order.
+        target_wavelengths (np.array): Center wavelength of each output band.
+        method (str): 'linear', 'cubic' or 'gaussian'. See resampling_matrix(). Default is 'linear'.
+        fwhm (np.array, optional): Full width at half maximum of each target band for 'gaussian'.
+        tile_pixels (int): Approximate number of pixels projected at once. Whole rows are taken for an image. Default is 131072.
+        out (np.array, optional): Output array (..., number of target bands). Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
+
+    Returns:
+        np.array: Resampled image or pixels (..., number of target bands).
+    '''
+    matrix = resampling_matrix(source_wavelengths, target_wavelengths, method, fwhm)
+    support = np.flatnonzero(np.any(matrix != 0, axis=1))
+    if len(support) == 0:
+        raise ValueError('No source band contributes to the target grid. source: %s, target: %s'
+                         % (describe_grid(source_wavelengths), describe_grid(target_wavelengths)))
+    band_slice = slice(support[0], support[-1] + 1)
+    matrix = matrix[band_slice]
+
+    out = prepare_output(out, hsi.shape[:-1] + (matrix.shape[1],), dtype)
+    step = max(1, tile_pixels // int(np.prod(hsi.shape[1:-1])))
+    for start in range(0, hsi.shape[0], step):
+        chunk = hsi[start:start + step, ..., band_slice].astype(np.float32)
+        np.copyto(out[start:start + step], chunk @ matrix, casting='unsafe')
+    return out
+
+
+def describe_grid(wavelengths):
+    wavelengths = np.atleast_1d(np.asarray(wavelengths, dtype=np.float64))
+    return '%d bands from %g to %g nm' % (len(wavelengths), wavelengths.min(), wavelengths.max())
+
+
+@lru_cache(maxsize=32)
+def _cached_resampling_matrix(source_wavelengths, target_wavelengths, method, fwhm):
+    source = np.array(source_wavelengths)
+    target = np.array(target_wavelengths)
+    if method == 'linear':
+        matrix = _linear_matrix(source, target)
+    elif method == 'cubic':
+        matrix = _cubic_matrix(source, target)
+    else:
+        matrix = _gaussian_matrix(source, target, None if fwhm is None else np.array(fwhm))
+    matrix = matrix.astype(np.float32)
+    matrix.setflags(write=False)
+    return matrix
+
+
+def _interval(source, target):
+    # Index of the source interval containing each target and the position inside it.
+    t = np.clip(target, source[0], source[-1])
+    index = np.clip(np.searchsorted(source, t, side='right') - 1, 0, len(source) - 2)
+    width = source[index + 1] - source[index]
+    return index, (t - source[index]) / width, width
+
+
+def _linear_matrix(source, target):
+    matrix = np.zeros((len(source), len(target)))
+    if len(source) == 1:
+        matrix[0] = 1
+        return matrix
+    index, position, _ = _interval(source, target)
+    columns = np.arange(len(target))
+    matrix[index, columns] = 1 - position
+    matrix[index + 1, columns] += position
+    return matrix
+
+
+def _cubic_matrix(source, target):
+    n = len(source)
+    if n < 3:
+        return _linear_matrix(source, target)
+
+    # Natural spline: second derivatives S @ y from the tridiagonal system A @ m = B @ y with m[0] = m[-1] = 0.
+    h = np.diff(source)
+    A = np.zeros((n - 2, n - 2))
+    B = np.zeros((n - 2, n))
+    rows = np.arange(n - 2)
+    A[rows, rows] = (h[:-1] + h[1:]) / 3
+    A[rows[1:], rows[1:] - 1] = h[1:-1] / 6
+    A[rows[:-1], rows[:-1] + 1] = h[1:-1] / 6
+    B[rows, rows] = 1 / h[:-1]
+    B[rows, rows + 1] = -1 / h[:-1] - 1 / h[1:]
+    B[rows, rows + 2] = 1 / h[1:]
+    S = np.zeros((n, n))
+    S[1:-1] = np.linalg.solve(A, B)
+
+    index, b, width = _interval(source, target)
+    a = 1 - b
+    matrix = _linear_matrix(source, target)
+    matrix += (S[index] * ((a ** 3 - a) * width ** 2 / 6)[:, np.newaxis]).T
+    matrix += (S[index + 1] * ((b ** 3 - b) * width ** 2 / 6)[:, np.newaxis]).T
+    return matrix
+
+
+def _gaussian_matrix(source, target, fwhm):
+    if fwhm is None:
+        fwhm = np.abs(np.gradient(target)) if len(target) > 1 else np.ones(1)
+    sigma = fwhm / (2 * np.sqrt(2 * np.log(2)))
+    source_width = np.abs(np.gradient(source)) if len(source) > 1 else np.ones(1)
+
+    response = np.exp(-0.5 * ((source[:, np.newaxis] - target) / sigma) ** 2) * source_width[:, np.newaxis]
+    response[response < 1e-6 * response.max(axis=0)] = 0
+    total = response.sum(axis=0)
+    return response / np.where(total > 0, total, 1)
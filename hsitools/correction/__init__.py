@@ -1 +1,3 @@
-from .blur import hsi_blur, hsi_gaussian_blur
\ No newline at end of file
+from .blur import hsi_blur, hsi_gaussian_blur
+from .defect import init_defect_statistics, update_defect_statistics, build_defect_map, build_defect_map_from_files, defect_repair_index, repair_defects
+from .denoise import hsi_guided_filter, hsi_bilateral_filter, hsi_pca_denoise
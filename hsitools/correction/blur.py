@@ -1,68 +1,99 @@
 import numpy as np
-import cv2
 
-def hsi_blur(hsi: np.array, kernel_size: int=5):
+from ..utils.buffer_pool import prepare_output
+from ..utils.optional_dependency import optional_import
+
+SMALL_GAUSSIAN_KERNELS = {1: [1.0], 3: [0.25, 0.5, 0.25], 5: [0.0625, 0.25, 0.375, 0.25, 0.0625],
+                          7: [0.03125, 0.109375, 0.21875, 0.28125, 0.21875, 0.109375, 0.03125],
+                          9: [0.015625, 0.05078125, 0.1171875, 0.19921875, 0.234375, 0.19921875, 0.1171875, 0.05078125, 0.015625]}
+
+def hsi_blur(hsi: np.array, kernel_size: int=5, out: np.array=None, dtype=np.float32):
     '''
     Apply blurring to an HSI image.
 
+    OpenCV is used when it is installed. Otherwise an equivalent filter is computed with NumPy.
+
     Parameters:
         hsi (np.array): Input HSI image.
         kernel_size (int): Size of the Gaussian kernel. Default is 5.
+        out (np.array, optional): Output array of the same shape as hsi. Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
 
     Returns:
         np.array: Smoothed HSI image.
     '''
-    blur_func = cv2.blur
-    smooth_hsi = integration_smooth_images_for_blur(hsi, blur_func, kernel_size)
+    cv2 = optional_import('cv2', required=False)
+    blur_func = cv2.blur if cv2 is not None else _numpy_blur
+    smooth_hsi = integration_smooth_images_for_blur(hsi, blur_func, kernel_size, out=out, dtype=dtype)
 
     return smooth_hsi
 
 
-def hsi_gaussian_blur(hsi: np.array, kernel_size: int=5, sigmaX: float=1):
+def hsi_gaussian_blur(hsi: np.array, kernel_size: int=5, sigmaX: float=1, out: np.array=None, dtype=np.float32):
     '''
     Apply Gaussian blurring to an HSI image.
 
+    OpenCV is used when it is installed. Otherwise an equivalent filter is computed with NumPy.
+
     Parameters:
         hsi (np.array): Input HSI image.
         kernel_size (int): Size of the Gaussian kernel. Default is 5.
         sigmaX (float): Standard deviation of the Gaussian kernel in the horizontal direction.
             A larger value results in more smoothing. If 0, it is calculated from the kernel size.
+        out (np.array, optional): Output array of the same shape as hsi. Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
 
     Returns:
         np.array: Smoothed HSI image.
     '''
-    blur_func = cv2.GaussianBlur
-    smooth_hsi = integration_smooth_images_for_blur(hsi, blur_func, kernel_size, sigmaX)
+    cv2 = optional_import('cv2', required=False)
+    blur_func = cv2.GaussianBlur if cv2 is not None else _numpy_gaussian_blur
+    smooth_hsi = integration_smooth_images_for_blur(hsi, blur_func, kernel_size, sigmaX, out=out, dtype=dtype)
     return smooth_hsi
 
 
-def integration_smooth_images_for_blur(hsi, blur_func, kernel_size, sigmaX=None):
-    band_size = hsi.shape[2]
-    if band_size % 3 == 0:
-        smooth_hsi = np.empty((hsi.shape[0], hsi.shape[1], 0))
-    elif band_size % 3 == 1:
-        if sigmaX:
-            smooth_hsi = blur_func(hsi[:, :, 0], (kernel_size, kernel_size), sigmaX)
-        else:
-            smooth_hsi = blur_func(hsi[:, :, 0], (kernel_size, kernel_size))
-        hsi = hsi[:, :, 1:]
-    else:
-        if sigmaX:
-            smooth_hsi = blur_func(hsi[:, :, 0], (kernel_size, kernel_size), sigmaX)
-            smooth_hsi = np.dstack([smooth_hsi, blur_func(hsi[:, :, 1], (kernel_size, kernel_size), sigmaX)])
-        else:
-            smooth_hsi = blur_func(hsi[:, :, 0], (kernel_size, kernel_size))
-            smooth_hsi = np.dstack([smooth_hsi, blur_func(hsi[:, :, 1], (kernel_size, kernel_size))])
-        hsi = hsi[:, :, 2:]
-
-
-    for i in range(int(hsi.shape[2] / 3)):
-        band = i * 3
-        gizi_rgb = hsi[:,:,band:band+3]
-        if sigmaX:
+def integration_smooth_images_for_blur(hsi, blur_func, kernel_size, sigmaX=None, out=None, dtype=np.float32):
+    # Blur 3 bands at a time and write every group directly into the preallocated output.
+    smooth_hsi = prepare_output(out, hsi.shape, dtype)
+    for band in range(0, hsi.shape[2], 3):
+        gizi_rgb = np.ascontiguousarray(hsi[:, :, band:band + 3], dtype=np.float32)
+        if sigmaX is not None:
             smooth_gizi_rgb = blur_func(gizi_rgb, (kernel_size, kernel_size), sigmaX)
         else:
             smooth_gizi_rgb = blur_func(gizi_rgb, (kernel_size, kernel_size))
-        smooth_hsi = np.dstack([smooth_hsi, smooth_gizi_rgb])
-        
-    return smooth_hsi
\ No newline at end of file
+        smooth_hsi[:, :, band:band + 3] = smooth_gizi_rgb.reshape(hsi.shape[0], hsi.shape[1], -1)
+
+    return smooth_hsi
+
+
+def _numpy_blur(img, ksize):
+    return _separable_filter(img, np.full(ksize[1], 1 / ksize[1]), np.full(ksize[0], 1 / ksize[0]))
+
+
+def _numpy_gaussian_blur(img, ksize, sigmaX):
+    return _separable_filter(img, _gaussian_kernel(ksize[1], sigmaX), _gaussian_kernel(ksize[0], sigmaX))
+
+
+def _gaussian_kernel(size, sigma):
+    # Same kernel as cv2.getGaussianKernel, including its fixed kernels for small sizes when sigma is not positive.
+    if sigma <= 0 and size in SMALL_GAUSSIAN_KERNELS:
+        return np.array(SMALL_GAUSSIAN_KERNELS[size])
+    if sigma <= 0:
+        sigma = 0.3 * ((size - 1) * 0.5 - 1) + 0.8
+    kernel = np.exp(-(np.arange(size) - (size - 1) / 2) ** 2 / (2 * sigma ** 2))
+    return kernel / kernel.sum()
+
+
+def _separable_filter(img, row_kernel, column_kernel):
+    # Correlate along the rows and then the columns with the border reflected as in cv2.BORDER_REFLECT_101.
+    img = img.astype(np.float32).reshape(img.shape[0], img.shape[1], -1)
+    for axis, kernel in ((0, row_kernel), (1, column_kernel)):
+        before = len(kernel) // 2
+        pad = [(0, 0)] * 3
+        pad[axis] = (before, len(kernel) - 1 - before)
+        padded = np.pad(img, pad, mode='reflect')
+        size = img.shape[axis]
+        img = np.zeros(img.shape, dtype=np.float32)
+        for i, weight in enumerate(kernel.astype(np.float32)):
+            img += weight * padded[(slice(None),) * axis + (slice(i, i + size),)]
+    return img
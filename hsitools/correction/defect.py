@@ -0,0 +1,206 @@
+import numpy as np
+
+from ..convert.nh9_to_array import nh9_to_array
+
+GOOD_PIXEL = 0
+DEAD_PIXEL = 1
+HOT_PIXEL = 2
+STRIPE_PIXEL = 3
+
+
+def init_defect_statistics(width: int=2048, spectral_dimension: int=151):
+    '''
+    Create empty streaming statistics used to build a defect map.
+
+    The NH9 is a pushbroom sensor, so every image row is one read-out of the (width, band) detector plane.
+    Dead, hot and miscalibrated detector elements therefore show up as whole columns of a single band,
+    and the statistics are kept on that plane only.
+
+    Parameters:
+        width (int): Width of the image.
+        spectral_dimension (int): Number of spectral dimensions.
+
+    Returns:
+        dict: Statistics to be passed to update_defect_statistics().
+    '''
+    return {'count': 0,
+            'ratio_sum': np.zeros((width, spectral_dimension)),
+            'std_ratio_sum': np.zeros((width, spectral_dimension))}
+
+
+def update_defect_statistics(stats: dict, hsi: np.array, neighbor_size: int=7, chunk_rows: int=32):
+    '''
+    Add one capture to the defect statistics.
+
+    Each column is compared against the median of its neighboring columns in the same band,
+    both for its mean level and for its variation along the rows.
+
+    Parameters:
+        stats (dict): Statistics created by init_defect_statistics().
+        hsi (np.array): Hyperspectral image (height, width, band).
+        neighbor_size (int): Number of columns used for the neighbor median. Must be odd. Default is 7.
+        chunk_rows (int): Number of rows processed at once. Default is 32.
+
+    Returns:
+        dict: The updated statistics.
+    '''
+    height = hsi.shape[0]
+    col_sum = np.zeros(hsi.shape[1:])
+    col_sq_sum = np.zeros(hsi.shape[1:])
+    for start in range(0, height, chunk_rows):
+        chunk = hsi[start:start + chunk_rows].astype(np.float64)
+        col_sum += chunk.sum(axis=0)
+        col_sq_sum += np.einsum('ijk,ijk->jk', chunk, chunk)
+
+    col_mean = col_sum / height
+    col_std = np.sqrt(np.maximum(col_sq_sum / height - col_mean ** 2, 0))
+
+    stats['count'] += 1
+    stats['ratio_sum'] += _relative_to_neighbors(col_mean, neighbor_size)
+    stats['std_ratio_sum'] += _relative_to_neighbors(col_std, neighbor_size)
+    return stats
+
+
+def build_defect_map(stats: dict, dead_threshold: float=0.2, hot_threshold: float=2.0, stripe_threshold: float=0.03, flat_threshold: float=0.05):
+    '''
+    Classify every detector element from accumulated defect statistics.
+
+    Parameters:
+        stats (dict): Statistics updated by update_defect_statistics().
+        dead_threshold (float): Columns whose level is below this fraction of their neighbors are dead. Default is 0.2.
+        hot_threshold (float): Columns whose level exceeds this multiple of their neighbors are hot. Default is 2.0.
+        stripe_threshold (float): Relative level deviation above which a column is marked as a stripe. Default is 0.03.
+        flat_threshold (float): Columns whose row-to-row variation is below this fraction of their neighbors are
+            treated as stuck (dead). Default is 0.05.
+
+    Returns:
+        np.array: Defect map (width, band) of uint8 codes.
+            GOOD_PIXEL (0), DEAD_PIXEL (1), HOT_PIXEL (2) or STRIPE_PIXEL (3).
+    '''
+    if stats['count'] == 0:
+        raise ValueError('The defect statistics do not contain any capture.')
+
+    mean_ratio = stats['ratio_sum'] / stats['count']
+    mean_std_ratio = stats['std_ratio_sum'] / stats['count']
+
+    defect_map = np.full(mean_ratio.shape, GOOD_PIXEL, dtype=np.uint8)
+    defect_map[np.abs(mean_ratio - 1) > stripe_threshold] = STRIPE_PIXEL
+    defect_map[(mean_ratio < dead_threshold) | (mean_std_ratio < flat_threshold)] = DEAD_PIXEL
+    defect_map[mean_ratio > hot_threshold] = HOT_PIXEL
+    return defect_map
+
+
+def build_defect_map_from_files(file_paths: list, height: int=1080, width: int=2048, spectral_dimension: int=151, **kwargs):
+    '''
+    Build a defect map from a set of NH9 captures.
+
+    Parameters:
+        file_paths (list of str): Paths to the hyperspectral image files.
+        height (int): Height of the images.
+        width (int): Width of the images.
+        spectral_dimension (int): Number of spectral dimensions.
+        **kwargs: Thresholds passed to build_defect_map().
+
+    Returns:
+        np.array: Defect map (width, band). Store it with np.save() and reuse it for every new frame.
+    '''
+    stats = init_defect_statistics(width, spectral_dimension)
+    for file_path in file_paths:
+        hsi = nh9_to_array(file_path, height, width, spectral_dimension)
+        stats = update_defect_statistics(stats, hsi)
+    return build_defect_map(stats, **kwargs)
+
+
+def defect_repair_index(defect_map: np.array):
+    '''
+    Precompute the interpolation used to repair every defective detector element.
+
+    Each defective column is linearly interpolated from the nearest good columns on its left and right in the same band.
+    Bands without any good column are left untouched.
+
+    Parameters:
+        defect_map (np.array): Defect map (width, band) from build_defect_map().
+
+    Returns:
+        dict: Column, band, left and right neighbor indices and the weight of the left neighbor for each defect.
+    '''
+    columns, bands, lefts, rights, left_weights = [], [], [], [], []
+    for band in range(defect_map.shape[1]):
+        bad = np.flatnonzero(defect_map[:, band] != GOOD_PIXEL)
+        good = np.flatnonzero(defect_map[:, band] == GOOD_PIXEL)
+        if len(bad) == 0 or len(good) == 0:
+            continue
+
+        position = np.searchsorted(good, bad)
+        left = good[np.clip(position - 1, 0, len(good) - 1)]
+        right = good[np.clip(position, 0, len(good) - 1)]
+        left = np.where(position == 0, right, left)
+        right = np.where(position == len(good), left, right)
+
+        distance = (right - left).astype(np.float32)
+        left_weight = np.where(distance > 0, (right - bad) / np.maximum(distance, 1), 1.0)
+
+        columns.append(bad)
+        bands.append(np.full(len(bad), band))
+        lefts.append(left)
+        rights.append(right)
+        left_weights.append(left_weight.astype(np.float32))
+
+    if len(columns) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return {'column': empty, 'band': empty, 'left': empty, 'right': empty, 'left_weight': np.empty(0, dtype=np.float32)}
+
+    return {'column': np.concatenate(columns),
+            'band': np.concatenate(bands),
+            'left': np.concatenate(lefts),
+            'right': np.concatenate(rights),
+            'left_weight': np.concatenate(left_weights)}
+
+
+def repair_defects(hsi: np.array, defect_map: np.array=None, repair_index: dict=None, out: np.array=None):
+    '''
+    Repair the defective samples of a hyperspectral image using a precomputed defect map.
+
+    Only the defective samples are read and written, so the cost scales with the number of defects.
+
+    Parameters:
+        hsi (np.array): Hyperspectral image (height, width, band).
+        defect_map (np.array, optional): Defect map (width, band) from build_defect_map().
+        repair_index (dict, optional): Result of defect_repair_index(). Pass it instead of defect_map to skip recomputing it per frame.
+        out (np.array, optional): Output array. Pass hsi itself to repair in place. If None, a copy of hsi is repaired.
+
+    Returns:
+        np.array: Repaired hyperspectral image.
+    '''
+    if repair_index is None:
+        if defect_map is None:
+            raise ValueError('Either defect_map or repair_index must be specified.')
+        repair_index = defect_repair_index(defect_map)
+
+    if out is None:
+        out = hsi.copy()
+    elif out is not hsi:
+        out[...] = hsi
+
+    band = repair_index['band']
+    left_weight = repair_index['left_weight']
+    left = hsi[:, repair_index['left'], band].astype(np.float32)
+    right = hsi[:, repair_index['right'], band].astype(np.float32)
+    repaired = left * left_weight + right * (1 - left_weight)
+
+    if np.issubdtype(out.dtype, np.integer):
+        repaired = np.rint(repaired)
+    out[:, repair_index['column'], band] = repaired
+    return out
+
+
+def _relative_to_neighbors(profile: np.array, neighbor_size: int):
+    half = neighbor_size // 2
+    padded = np.pad(profile, ((half, half), (0, 0)), mode='reflect')
+    windows = np.lib.stride_tricks.sliding_window_view(padded, neighbor_size, axis=0)
+    reference = np.median(windows, axis=-1)
+
+    ratio = np.ones_like(profile)
+    valid = reference > 1e-6
+    ratio[valid] = profile[valid] / reference[valid]
+    return ratio
@@ -0,0 +1,222 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from ..convert.hs_to_rgb import hs_to_rgb
+from ..utils.optional_dependency import optional_import
+
+
+def hsi_guided_filter(hsi: np.array, guide: np.array=None, radius: int=8, eps: float=1e-3, subsample: int=4, band_group: int=16, tile_rows: int=128, n_jobs: int=None, out: np.array=None, wavelengths: np.array=None):
+    '''
+    Apply an edge-preserving guided filter to an HSI image.
+
+    Every band is smoothed with a locally linear model of a color guide image, so material edges visible in the guide are kept.
+    The guide statistics are computed once per tile and shared by all bands of that tile.
+    The linear coefficients are estimated on an image subsampled by subsample and upsampled again (fast guided filter).
+
+    Parameters:
+        hsi (np.array): Input HSI image (height, width, band).
+        guide (np.array, optional): Guide image (height, width, 3) or (height, width) with values in 0 to 1.
+            If None, an RGB guide is computed with hs_to_rgb() and scaled to 0 to 1.
+        radius (int): Radius of the local window in full-resolution pixels. Default is 8.
+        eps (float): Regularization of the guide variance. Larger values give more smoothing. Default is 1e-3.
+        subsample (int): Subsampling factor used to estimate the coefficients. 1 gives the exact guided filter. Default is 4.
+        band_group (int): Number of bands filtered together. Default is 16.
+        tile_rows (int): Number of rows processed by one task. Default is 128.
+        n_jobs (int, optional): Number of worker threads. If None, the number of CPUs is used.
+        out (np.array, optional): Output array (height, width, band). If None, a float32 array is allocated.
+        wavelengths (np.array, optional): Wavelength of each band, used for the RGB guide. If None, the 350 to 1100 nm grid at 5 nm steps is assumed.
+
+    Returns:
+        np.array: Smoothed HSI image.
+    '''
+    cv2 = optional_import('cv2')
+    height, width, band_size = hsi.shape
+    if out is None:
+        out = np.empty((height, width, band_size), dtype=np.float32)
+
+    rgb_guide = _rgb_guide(hsi, wavelengths) if guide is None else None
+    if guide is not None and guide.ndim == 2:
+        guide = guide[:, :, np.newaxis]
+
+    low_radius = max(radius // subsample, 1)
+    ksize = (2 * low_radius + 1, 2 * low_radius + 1)
+
+    def filter_tile(start, stop, halo_start, halo_stop):
+        I = rgb_guide(halo_start, halo_stop) if guide is None else guide[halo_start:halo_stop].astype(np.float32)
+        tile_height = I.shape[0]
+        tile_size = (-(-I.shape[1] // subsample) * subsample, -(-tile_height // subsample) * subsample)
+        channels = I.shape[2]
+
+        I_low = _downsample(I, subsample)
+        mean_I = _filter_channels(I_low, cv2.boxFilter, -1, ksize)
+        cov_II = np.empty(I_low.shape[:2] + (channels, channels), dtype=np.float32)
+        for i in range(channels):
+            for j in range(i, channels):
+                cov_II[:, :, i, j] = cv2.boxFilter(I_low[:, :, i] * I_low[:, :, j], -1, ksize) - mean_I[:, :, i] * mean_I[:, :, j]
+                cov_II[:, :, j, i] = cov_II[:, :, i, j]
+        cov_II += eps * np.eye(channels, dtype=np.float32)
+        inv_cov_II = np.linalg.inv(cov_II)
+
+        inner = slice(start - halo_start, stop - halo_start)
+        for band in range(0, band_size, band_group):
+            p_low = _downsample(hsi[halo_start:halo_stop, :, band:band + band_group], subsample)
+            mean_p = _filter_channels(p_low, cv2.boxFilter, -1, ksize)
+            cov_Ip = np.stack([_filter_channels(I_low[:, :, c:c + 1] * p_low, cv2.boxFilter, -1, ksize) - mean_I[:, :, c:c + 1] * mean_p
+                               for c in range(channels)], axis=2)
+            a = inv_cov_II @ cov_Ip
+            b = mean_p - (a * mean_I[:, :, :, np.newaxis]).sum(axis=2)
+
+            q = _upsample(_filter_channels(b, cv2.boxFilter, -1, ksize), tile_size)[:tile_height, :width]
+            for c in range(channels):
+                mean_a = _filter_channels(a[:, :, c], cv2.boxFilter, -1, ksize)
+                q += _upsample(mean_a, tile_size)[:tile_height, :width] * I[:, :, c:c + 1]
+            out[start:stop, :, band:band + band_group] = q[inner]
+
+    # Align the tiles to the subsampling grid so that tiling does not change the result.
+    tile_rows = -(-tile_rows // subsample) * subsample
+    halo = -(-(2 * radius + subsample) // subsample) * subsample
+    _process_row_tiles(height, tile_rows, halo, filter_tile, n_jobs)
+    return out
+
+
+def hsi_bilateral_filter(hsi: np.array, guide: np.array=None, d: int=5, sigma_color: float=0.1, sigma_space: float=3, tile_rows: int=32,
+                         n_jobs: int=None, out: np.array=None, wavelengths: np.array=None):
+    '''
+    Apply an edge-preserving joint bilateral filter to an HSI image.
+
+    The range weights are computed from a color guide image, so all bands are smoothed with the same weights
+    and material edges visible in the guide are kept.
+
+    Parameters:
+        hsi (np.array): Input HSI image (height, width, band).
+        guide (np.array, optional): Guide image (height, width, 3) or (height, width) with values in 0 to 1.
+            If None, an RGB guide is computed with hs_to_rgb() and scaled to 0 to 1.
+        d (int): Diameter of the pixel neighborhood. Default is 5.
+        sigma_color (float): Filter sigma in the intensity domain of the guide. Default is 0.1.
+        sigma_space (float): Filter sigma in the coordinate space. Default is 3.
+        tile_rows (int): Number of rows processed by one task. Default is 32.
+        n_jobs (int, optional): Number of worker threads. If None, the number of CPUs is used.
+        out (np.array, optional): Output array (height, width, band). If None, a float32 array is allocated.
+        wavelengths (np.array, optional): Wavelength of each band, used for the RGB guide. If None, the 350 to 1100 nm grid at 5 nm steps is assumed.
+
+    Returns:
+        np.array: Smoothed HSI image.
+    '''
+    height, width, band_size = hsi.shape
+    if out is None:
+        out = np.empty(hsi.shape, dtype=np.float32)
+
+    rgb_guide = _rgb_guide(hsi, wavelengths) if guide is None else None
+    if guide is not None and guide.ndim == 2:
+        guide = guide[:, :, np.newaxis]
+
+    # Circular neighborhood as in cv2.bilateralFilter.
+    radius = d // 2
+    offsets = [(dy, dx) for dy in range(-radius, radius + 1) for dx in range(-radius, radius + 1) if dy * dy + dx * dx <= radius * radius]
+
+    def filter_tile(start, stop, halo_start, halo_stop):
+        I = rgb_guide(halo_start, halo_stop) if guide is None else guide[halo_start:halo_stop].astype(np.float32)
+        pad = ((radius - (start - halo_start), radius - (halo_stop - stop)), (radius, radius), (0, 0))
+        I = np.pad(I, pad, mode='reflect')
+        P = np.pad(hsi[halo_start:halo_stop].astype(np.float32), pad, mode='reflect')
+        tile_height = stop - start
+        center = I[radius:radius + tile_height, radius:radius + width]
+
+        total = np.zeros((tile_height, width, band_size), dtype=np.float32)
+        weight_sum = np.zeros((tile_height, width, 1), dtype=np.float32)
+        for dy, dx in offsets:
+            rows, columns = slice(radius + dy, radius + dy + tile_height), slice(radius + dx, radius + dx + width)
+            distance = np.sum((I[rows, columns] - center) ** 2, axis=2, keepdims=True)
+            weight = np.exp(-distance / (2 * sigma_color ** 2) - (dy * dy + dx * dx) / (2 * sigma_space ** 2))
+            total += weight * P[rows, columns]
+            weight_sum += weight
+        out[start:stop] = total / weight_sum
+
+    _process_row_tiles(height, tile_rows, radius, filter_tile, n_jobs)
+    return out
+
+
+def hsi_pca_denoise(hsi: np.array, n_components: int=10, kernel_size: int=5, sigmaX: float=1, sample_step: int=4, tile_rows: int=128, n_jobs: int=None, out: np.array=None):
+    '''
+    Denoise an HSI image in the PCA domain.
+
+    The principal components are estimated from a subsample of pixels.
+    The first n_components high-variance components, which carry the signal, are kept as is,
+    and only the remaining low-variance components are smoothed with a Gaussian kernel.
+
+    Parameters:
+        hsi (np.array): Input HSI image (height, width, band).
+        n_components (int): Number of high-variance components kept without filtering. Default is 10.
+        kernel_size (int): Size of the Gaussian kernel applied to the low-variance components. Default is 5.
+        sigmaX (float): Standard deviation of the Gaussian kernel. Default is 1.
+        sample_step (int): Pixel stride used to subsample the image for the PCA. Default is 4.
+        tile_rows (int): Number of rows processed by one task. Default is 128.
+        n_jobs (int, optional): Number of worker threads. If None, the number of CPUs is used.
+        out (np.array, optional): Output array (height, width, band). If None, a float32 array is allocated.
+
+    Returns:
+        np.array: Denoised HSI image.
+    '''
+    cv2 = optional_import('cv2')
+    height, width, band_size = hsi.shape
+    if out is None:
+        out = np.empty((height, width, band_size), dtype=np.float32)
+
+    samples = hsi[::sample_step, ::sample_step].reshape(-1, band_size).astype(np.float64)
+    mean = samples.mean(axis=0)
+    eigen_values, eigen_vectors = np.linalg.eigh(np.cov(samples, rowvar=False))
+    low_variance = eigen_vectors[:, np.argsort(eigen_values)[::-1][n_components:]].astype(np.float32)
+    mean = mean.astype(np.float32)
+
+    def denoise_tile(start, stop, halo_start, halo_stop):
+        tile = hsi[halo_start:halo_stop].astype(np.float32) - mean
+        components = tile @ low_variance
+        smooth = _filter_channels(components, cv2.GaussianBlur, (kernel_size, kernel_size), sigmaX)
+        tile += (smooth - components) @ low_variance.T
+        tile += mean
+        out[start:stop] = tile[start - halo_start:stop - halo_start]
+
+    _process_row_tiles(height, tile_rows, kernel_size // 2, denoise_tile, n_jobs)
+    return out
+
+
+def _rgb_guide(hsi, wavelengths):
+    # Returns a function computing the RGB guide of a range of rows, scaled to 0 to 1 with the maximum of a subsampled image.
+    band_num = len(wavelengths) if wavelengths is not None else 151
+    if hsi.shape[2] != band_num:
+        raise ValueError('hsi has %d bands but the wavelength grid has %d. Pass wavelengths for the RGB guide, or a guide image.' % (hsi.shape[2], band_num))
+    scale = max(float(hs_to_rgb(hsi[::16, ::16], wavelengths=wavelengths).max()), 1e-12)
+    return lambda start, stop: np.clip(hs_to_rgb(hsi[start:stop], wavelengths=wavelengths) / scale, 0, 1).astype(np.float32)
+
+
+def _process_row_tiles(height, tile_rows, halo, func, n_jobs=None):
+    tiles = [(start, min(start + tile_rows, height), max(start - halo, 0), min(start + tile_rows + halo, height))
+             for start in range(0, height, tile_rows)]
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as executor:
+        list(executor.map(lambda tile: func(*tile), tiles))
+
+
+def _filter_channels(img, filter_func, *args):
+    # OpenCV filters only accept a limited number of channels, so filter at most 16 channels at a time.
+    out = np.empty(img.shape, dtype=np.float32)
+    for channel in range(0, img.shape[2], 16):
+        smooth = filter_func(np.ascontiguousarray(img[:, :, channel:channel + 16], dtype=np.float32), *args)
+        out[:, :, channel:channel + 16] = smooth.reshape(img.shape[0], img.shape[1], -1)
+    return out
+
+
+def _downsample(img, factor):
+    height, width = -(-img.shape[0] // factor), -(-img.shape[1] // factor)
+    pad = ((0, height * factor - img.shape[0]), (0, width * factor - img.shape[1]), (0, 0))
+    img = np.pad(img.astype(np.float32), pad, mode='edge')
+    return img.reshape(height, factor, width, factor, -1).mean(axis=(1, 3))
+
+
+def _upsample(img, size):
+    cv2 = optional_import('cv2')
+    out = np.empty((size[1], size[0], img.shape[2]), dtype=np.float32)
+    for channel in range(0, img.shape[2], 4):
+        resized = cv2.resize(np.ascontiguousarray(img[:, :, channel:channel + 4]), size, interpolation=cv2.INTER_LINEAR)
+        out[:, :, channel:channel + 4] = resized.reshape(size[1], size[0], -1)
+    return out
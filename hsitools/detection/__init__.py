@@ -0,0 +1 @@
+from .target_detection import init_background_statistics, update_background_statistics, finalize_background_statistics, background_statistics_from_hsi, rx_detector, matched_filter, ace_detector, local_rx_detector
\ No newline at end of file
@@ -0,0 +1,274 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+def init_background_statistics(band_num: int=151):
+    '''
+    Create empty streaming statistics of the background spectra.
+
+    Parameters:
+        band_num (int): Number of spectral bands.
+
+    Returns:
+        dict: Statistics to be passed to update_background_statistics().
+    '''
+    return {'count': 0, 'sum': np.zeros(band_num), 'outer_sum': np.zeros((band_num, band_num))}
+
+
+def update_background_statistics(stats: dict, hs_pixels: np.array, chunk_size: int=65536):
+    '''
+    Add background pixels to the streaming statistics.
+
+    Parameters:
+        stats (dict): Statistics created by init_background_statistics().
+        hs_pixels (np.array): Background pixels (number of data, band), e.g. from extract_pixels_from_hsi(),
+            or a tile of a hyperspectral image (height, width, band).
+        chunk_size (int): Number of pixels accumulated at once. Default is 65536.
+
+    Returns:
+        dict: The updated statistics.
+    '''
+    hs_pixels = hs_pixels.reshape(-1, hs_pixels.shape[-1])
+    for start in range(0, hs_pixels.shape[0], chunk_size):
+        X = hs_pixels[start:start + chunk_size].astype(np.float64)
+        stats['count'] += X.shape[0]
+        stats['sum'] += X.sum(axis=0)
+        stats['outer_sum'] += X.T @ X
+    return stats
+
+
+def finalize_background_statistics(stats: dict, regularization: float=1e-6):
+    '''
+    Compute the background mean and covariance and cache the factors used by the detectors.
+
+    Parameters:
+        stats (dict): Statistics updated by update_background_statistics().
+        regularization (float): Diagonal loading relative to the average variance. Default is 1e-6.
+
+    Returns:
+        dict: Background model with the mean, the covariance, its Cholesky factor and the whitening matrix (inverse of the Cholesky factor).
+    '''
+    if stats['count'] < 2:
+        raise ValueError('At least two background pixels are required.')
+
+    mean = stats['sum'] / stats['count']
+    covariance = (stats['outer_sum'] - stats['count'] * np.outer(mean, mean)) / (stats['count'] - 1)
+    covariance += regularization * np.trace(covariance) / len(mean) * np.eye(len(mean))
+    cholesky = np.linalg.cholesky(covariance)
+    whitening = np.linalg.inv(cholesky)
+    return {'mean': mean, 'covariance': covariance, 'cholesky': cholesky, 'whitening': whitening}
+
+
+def background_statistics_from_hsi(hsi: np.array, sample_step: int=1, regularization: float=1e-6, tile_rows: int=64):
+    '''
+    Estimate the background model from a whole hyperspectral image (HSI).
+
+    Parameters:
+        hsi (np.array): Hyperspectral image (height, width, band).
+        sample_step (int): Pixel stride used to subsample the image. Default is 1.
+        regularization (float): Diagonal loading relative to the average variance. Default is 1e-6.
+        tile_rows (int): Number of rows accumulated at once. Default is 64.
+
+    Returns:
+        dict: Background model from finalize_background_statistics().
+    '''
+    hsi = hsi[::sample_step, ::sample_step]
+    stats = init_background_statistics(hsi.shape[2])
+    for start in range(0, hsi.shape[0], tile_rows):
+        stats = update_background_statistics(stats, hsi[start:start + tile_rows])
+    return finalize_background_statistics(stats, regularization)
+
+
+def rx_detector(hsi: np.array, background: dict=None, tile_rows: int=64, out: np.array=None):
+    '''
+    Compute the global RX anomaly score (Mahalanobis distance to the background) of every pixel.
+
+    Parameters:
+        hsi (np.array): Hyperspectral image (height, width, band).
+        background (dict, optional): Background model. If None, it is estimated from hsi.
+        tile_rows (int): Number of rows processed at once. Default is 64.
+        out (np.array, optional): Output array (height, width). If None, a float32 array is allocated.
+
+    Returns:
+        np.array: RX score map (height, width).
+    '''
+    if background is None:
+        background = background_statistics_from_hsi(hsi)
+    if out is None:
+        out = np.empty(hsi.shape[:2], dtype=np.float32)
+
+    for start, Z in _whitened_tiles(hsi, background, tile_rows):
+        out[start:start + Z.shape[0]] = np.einsum('ijk,ijk->ij', Z, Z)
+    return out
+
+
+def matched_filter(hsi: np.array, target_spectrum: np.array, background: dict=None, tile_rows: int=64, out: np.array=None):
+    '''
+    Compute the matched filter score of every pixel for a target spectrum.
+
+    The score is normalized so that the target spectrum itself scores 1.
+
+    Parameters:
+        hsi (np.array): Hyperspectral image (height, width, band).
+        target_spectrum (np.array): Target spectrum (band,).
+        background (dict, optional): Background model. If None, it is estimated from hsi.
+        tile_rows (int): Number of rows processed at once. Default is 64.
+        out (np.array, optional): Output array (height, width). If None, a float32 array is allocated.
+
+    Returns:
+        np.array: Matched filter score map (height, width).
+    '''
+    if background is None:
+        background = background_statistics_from_hsi(hsi)
+    if out is None:
+        out = np.empty(hsi.shape[:2], dtype=np.float32)
+
+    target = _whiten_target(target_spectrum, background)
+    target_energy = target @ target
+    for start, Z in _whitened_tiles(hsi, background, tile_rows):
+        out[start:start + Z.shape[0]] = (Z @ target) / target_energy
+    return out
+
+
+def ace_detector(hsi: np.array, target_spectrum: np.array, background: dict=None, tile_rows: int=64, out: np.array=None):
+    '''
+    Compute the adaptive coherence estimator (ACE) score of every pixel for a target spectrum.
+
+    Parameters:
+        hsi (np.array): Hyperspectral image (height, width, band).
+        target_spectrum (np.array): Target spectrum (band,).
+        background (dict, optional): Background model. If None, it is estimated from hsi.
+        tile_rows (int): Number of rows processed at once. Default is 64.
+        out (np.array, optional): Output array (height, width). If None, a float32 array is allocated.
+
+    Returns:
+        np.array: ACE score map (height, width) with values in 0 to 1.
+    '''
+    if background is None:
+        background = background_statistics_from_hsi(hsi)
+    if out is None:
+        out = np.empty(hsi.shape[:2], dtype=np.float32)
+
+    target = _whiten_target(target_spectrum, background)
+    target_energy = target @ target
+    for start, Z in _whitened_tiles(hsi, background, tile_rows):
+        pixel_energy = np.einsum('ijk,ijk->ij', Z, Z)
+        out[start:start + Z.shape[0]] = (Z @ target) ** 2 / np.maximum(target_energy * pixel_energy, 1e-12)
+    return out
+
+
+def local_rx_detector(hsi: np.array, window_size: int=15, guard_size: int=5, n_components: int=10, background: dict=None, regularization: float=1e-3, tile_rows: int=64, n_jobs: int=None,
+                      max_memory: int=2 * 1024 ** 3, out: np.array=None):
+    '''
+    Compute the local RX anomaly score of every pixel against the pixels of a surrounding window.
+
+    The pixels are first projected onto the n_components principal components of the background.
+    The local mean and covariance of every window are then obtained from integral images,
+    so the cost per pixel does not depend on the window size. Pixels inside the guard window are excluded from the background.
+
+    Parameters:
+        hsi (np.array): Hyperspectral image (height, width, band).
+        window_size (int): Size of the outer background window. Must be odd. Default is 15.
+        guard_size (int): Size of the inner guard window excluded from the background. Must be odd, or 0 for no guard. Default is 5.
+        n_components (int): Number of principal components used. Default is 10.
+        background (dict, optional): Global background model used for the projection. If None, it is estimated from hsi.
+        regularization (float): Diagonal loading of the local covariances relative to their average variance. Default is 1e-3.
+        tile_rows (int): Number of rows processed by one task. Default is 64.
+        n_jobs (int, optional): Number of worker threads. If None, the number of CPUs is used.
+            It is reduced so that the working memory of all threads stays within max_memory.
+        max_memory (int): Approximate working memory in bytes shared by all threads. Default is 2 GiB.
+        out (np.array, optional): Output array (height, width). If None, a float32 array is allocated.
+
+    Returns:
+        np.array: Local RX score map (height, width).
+    '''
+    if not 1 <= n_components <= hsi.shape[2]:
+        raise ValueError('n_components must be between 1 and the number of bands (%d), but is %d.' % (hsi.shape[2], n_components))
+    if background is None:
+        background = background_statistics_from_hsi(hsi, sample_step=4)
+    if out is None:
+        out = np.empty(hsi.shape[:2], dtype=np.float32)
+
+    eigen_values, eigen_vectors = np.linalg.eigh(background['covariance'])
+    projection = eigen_vectors[:, np.argsort(eigen_values)[::-1][:n_components]]
+    projected_mean = background['mean'] @ projection
+    projection = projection.astype(np.float32)
+    upper = np.triu_indices(n_components)
+    # Position of every (i, j) entry of the covariance among the stored upper-triangle moments.
+    upper_position = np.zeros((n_components, n_components), dtype=np.intp)
+    upper_position[upper] = np.arange(len(upper[0]))
+    upper_position = np.maximum(upper_position, upper_position.T).ravel() + n_components + 1
+
+    height, width = hsi.shape[:2]
+    outer_radius, guard_radius = window_size // 2, guard_size // 2
+
+    # The moments and window sums are float64 because the integral images cancel large sums. The covariances are float32.
+    moment_num = n_components + 1 + len(upper[0])
+    tile_memory = (8 * moment_num * ((tile_rows + 2 * outer_radius + 1) * (width + 2 * outer_radius + 1) + 2 * tile_rows * width)
+                   + 12 * tile_rows * width * n_components ** 2)
+    n_jobs = max(min(n_jobs or os.cpu_count(), max_memory // tile_memory), 1)
+
+    def detect_tile(start):
+        stop = min(start + tile_rows, height)
+        halo_start, halo_stop = max(start - outer_radius, 0), min(stop + outer_radius, height)
+        Y = (hsi[halo_start:halo_stop].astype(np.float32) @ projection) - projected_mean
+
+        # Zero padding makes every window a plain slice of the integral image and excludes outside pixels from the counts.
+        # The first row and column stay zero and the integral image is computed in place.
+        pad_top, pad_bottom = outer_radius - (start - halo_start), outer_radius - (halo_stop - stop)
+        integral = np.zeros((Y.shape[0] + pad_top + pad_bottom + 1, Y.shape[1] + 2 * outer_radius + 1, moment_num))
+        inside = integral[1 + pad_top:1 + pad_top + Y.shape[0], 1 + outer_radius:1 + outer_radius + Y.shape[1]]
+        inside[:, :, 0] = 1
+        inside[:, :, 1:n_components + 1] = Y
+        np.multiply(Y[:, :, upper[0]], Y[:, :, upper[1]], out=inside[:, :, n_components + 1:])
+
+        _integral_image(integral)
+        window_sum = _window_sum(integral, outer_radius, outer_radius)
+        if guard_size > 0:
+            window_sum -= _window_sum(integral, outer_radius, guard_radius)
+        del integral
+        window_sum = window_sum.reshape(-1, moment_num)
+
+        count = np.maximum(window_sum[:, :1], 1)
+        window_mean = (window_sum / count).astype(np.float32)
+        del window_sum
+        local_mean = window_mean[:, 1:n_components + 1]
+        local_covariance = window_mean[:, upper_position].reshape(-1, n_components, n_components)
+        local_covariance -= local_mean[:, :, np.newaxis] * local_mean[:, np.newaxis, :]
+        loading = regularization * np.trace(local_covariance, axis1=1, axis2=2) / n_components + 1e-12
+        local_covariance[:, np.arange(n_components), np.arange(n_components)] += loading[:, np.newaxis]
+
+        residual = Y[start - halo_start:stop - halo_start].reshape(-1, n_components) - local_mean
+        solved = np.linalg.solve(local_covariance, residual[:, :, np.newaxis])[:, :, 0]
+        out[start:stop] = np.sum(residual * solved, axis=1).reshape(stop - start, -1)
+
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as executor:
+        list(executor.map(detect_tile, range(0, height, tile_rows)))
+    return out
+
+
+def _whiten_target(target_spectrum, background):
+    return (background['whitening'] @ (np.asarray(target_spectrum, dtype=np.float64) - background['mean'])).astype(np.float32)
+
+
+def _whitened_tiles(hsi, background, tile_rows):
+    whitening = background['whitening'].T.astype(np.float32)
+    mean = background['mean'].astype(np.float32)
+    for start in range(0, hsi.shape[0], tile_rows):
+        yield start, (hsi[start:start + tile_rows].astype(np.float32) - mean) @ whitening
+
+
+def _integral_image(integral):
+    # In place on an image whose first row and column are zero.
+    np.cumsum(integral[1:, 1:], axis=0, out=integral[1:, 1:])
+    np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+    return integral
+
+
+def _window_sum(integral, padding, radius):
+    # Window sums of the unpadded pixels from the integral image of an image zero-padded by padding.
+    height, width = integral.shape[0] - 1 - 2 * padding, integral.shape[1] - 1 - 2 * padding
+    low, high = padding - radius, padding + radius + 1
+    return (integral[high:high + height, high:high + width] - integral[low:low + height, high:high + width]
+            - integral[high:high + height, low:low + width] + integral[low:low + height, low:low + width])
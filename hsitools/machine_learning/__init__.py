@@ -1 +1,3 @@
-from .annotate_hspixels import *
\ No newline at end of file
+from .annotate_hspixels import *
+from .linear_classifier import batch_hspixels, train_lda, train_logistic_regression, train_linear_svm, predict_hspixels, classify_hsi
+from .patch_sampler import sample_patches
\ No newline at end of file
@@ -0,0 +1,199 @@
+import numpy as np
+
+
+def batch_hspixels(hs_pixels: np.array, labels: np.array, batch_size: int=4096, shuffle: bool=True, seed: int=None):
+    '''
+    Split annotated hyperspectral pixels into training batches.
+
+    Parameters:
+        hs_pixels (np.array): Hyperspectral pixels. shape=(number of data, band)
+        labels (np.array): Labels corresponding to pixels, e.g. np.concatenate(annotate_hspixels_list(...)).
+        batch_size (int): Number of pixels per batch. Default is 4096.
+        shuffle (bool): Whether to shuffle the pixels before splitting. Default is True.
+        seed (int, optional): Seed of the shuffle.
+
+    Returns:
+        list of tuple: List of (pixels, labels) batches.
+    '''
+    if shuffle:
+        order = np.random.default_rng(seed).permutation(len(labels))
+        hs_pixels, labels = hs_pixels[order], labels[order]
+    return [(hs_pixels[start:start + batch_size], labels[start:start + batch_size]) for start in range(0, len(labels), batch_size)]
+
+
+def train_lda(batches, normalization: tuple=None, regularization: float=1e-4):
+    '''
+    Train a linear discriminant analysis (LDA) classifier from streamed batches in a single pass.
+
+    Parameters:
+        batches (iterable or callable): Iterable of (pixels, labels) batches, or a callable returning one. pixels has shape (number of data, band).
+        normalization (tuple, optional): (shift, scale) from normalization_parameters(). It is fused into the model.
+        regularization (float): Diagonal loading of the pooled covariance relative to its average variance. Default is 1e-4.
+
+    Returns:
+        dict: Linear model with 'weights' (band, number of classes), 'bias' (number of classes,) and 'classes'.
+    '''
+    if callable(batches):
+        batches = batches()
+    counts, sums = {}, {}
+    outer_sum = None
+    for pixels, labels in batches:
+        X = _normalize(pixels, normalization)
+        if outer_sum is None:
+            outer_sum = np.zeros((X.shape[1], X.shape[1]))
+        outer_sum += X.T @ X
+        for label in np.unique(labels):
+            X_label = X[labels == label]
+            counts[label] = counts.get(label, 0) + len(X_label)
+            sums[label] = sums.get(label, 0) + X_label.sum(axis=0)
+
+    if outer_sum is None:
+        raise ValueError('No batches to train on.')
+    classes = np.array(sorted(counts))
+    count = np.array([counts[label] for label in classes], dtype=np.float64)
+    means = np.stack([sums[label] for label in classes]) / count[:, np.newaxis]
+
+    covariance = (outer_sum - (means.T * count) @ means) / max(count.sum() - len(classes), 1)
+    covariance += regularization * np.trace(covariance) / len(covariance) * np.eye(len(covariance))
+    weights = np.linalg.solve(covariance, means.T)
+    bias = -0.5 * np.sum(means.T * weights, axis=0) + np.log(count / count.sum())
+    return _fuse_normalization(weights, bias, classes, normalization)
+
+
+def train_logistic_regression(batches, classes: np.array=None, normalization: tuple=None, epochs: int=10, learning_rate: float=0.1, l2: float=1e-4):
+    '''
+    Train a multinomial logistic regression classifier with mini-batch gradient descent.
+
+    Parameters:
+        batches (iterable or callable): Iterable of (pixels, labels) batches. pixels has shape (number of data, band).
+            When epochs > 1 or classes is None it is read several times, so it must be re-iterable (e.g. a list from batch_hspixels())
+            or a callable returning a new iterable of batches for every pass (e.g. a generator function streaming from files).
+        classes (np.array, optional): All class labels. If None, they are collected from the batches.
+        normalization (tuple, optional): (shift, scale) from normalization_parameters(). It is fused into the model.
+        epochs (int): Number of passes over the batches. Default is 10.
+        learning_rate (float): Step size of the gradient descent. Default is 0.1.
+        l2 (float): L2 regularization of the weights. Default is 1e-4.
+
+    Returns:
+        dict: Linear model with 'weights' (band, number of classes), 'bias' (number of classes,) and 'classes'.
+    '''
+    def gradient(target, scores):
+        scores -= scores.max(axis=1, keepdims=True)
+        probability = np.exp(scores)
+        probability /= probability.sum(axis=1, keepdims=True)
+        return probability - target
+
+    return _train_sgd(batches, classes, normalization, epochs, learning_rate, l2, gradient, negative=0)
+
+
+def train_linear_svm(batches, classes: np.array=None, normalization: tuple=None, epochs: int=10, learning_rate: float=0.01, l2: float=1e-4):
+    '''
+    Train a one-vs-rest linear support vector machine (SVM) with mini-batch subgradient descent on the hinge loss.
+
+    Parameters:
+        batches (iterable or callable): Iterable of (pixels, labels) batches. pixels has shape (number of data, band).
+            When epochs > 1 or classes is None it is read several times, so it must be re-iterable (e.g. a list from batch_hspixels())
+            or a callable returning a new iterable of batches for every pass (e.g. a generator function streaming from files).
+        classes (np.array, optional): All class labels. If None, they are collected from the batches.
+        normalization (tuple, optional): (shift, scale) from normalization_parameters(). It is fused into the model.
+        epochs (int): Number of passes over the batches. Default is 10.
+        learning_rate (float): Step size of the subgradient descent. Default is 0.01.
+        l2 (float): L2 regularization of the weights. Default is 1e-4.
+
+    Returns:
+        dict: Linear model with 'weights' (band, number of classes), 'bias' (number of classes,) and 'classes'.
+    '''
+    def gradient(target, scores):
+        return -target * (target * scores < 1)
+
+    return _train_sgd(batches, classes, normalization, epochs, learning_rate, l2, gradient, negative=-1)
+
+
+def predict_hspixels(hs_pixels: np.array, model: dict):
+    '''
+    Predict the labels of hyperspectral pixels with a linear model.
+
+    Parameters:
+        hs_pixels (np.array): Hyperspectral pixels. shape=(number of data, band)
+        model (dict): Model from train_lda(), train_logistic_regression() or train_linear_svm().
+
+    Returns:
+        np.array: Predicted labels. shape=(number of data,)
+    '''
+    scores = hs_pixels.astype(np.float32) @ model['weights'] + model['bias']
+    return model['classes'][np.argmax(scores, axis=1)]
+
+
+def classify_hsi(hsi: np.array, model: dict, chunk_rows: int=64, out: np.array=None):
+    '''
+    Classify every pixel of a hyperspectral image (HSI) with a linear model.
+
+    Parameters:
+        hsi (np.array): Hyperspectral image (height, width, band).
+        model (dict): Model from train_lda(), train_logistic_regression() or train_linear_svm().
+            Its class labels must be in the range 0 to 255.
+        chunk_rows (int): Number of rows classified at once. Default is 64.
+        out (np.array, optional): Preallocated uint8 label map (height, width). If None, it is allocated.
+
+    Returns:
+        np.array: Label map (height, width) of dtype uint8.
+    '''
+    classes = model['classes']
+    if classes.min() < 0 or classes.max() > 255:
+        raise ValueError('Class labels must be in the range 0 to 255 to be stored in a uint8 label map.')
+    classes = classes.astype(np.uint8)
+
+    if out is None:
+        out = np.empty(hsi.shape[:2], dtype=np.uint8)
+
+    for start in range(0, hsi.shape[0], chunk_rows):
+        chunk = hsi[start:start + chunk_rows].astype(np.float32)
+        scores = chunk @ model['weights']
+        scores += model['bias']
+        out[start:start + chunk_rows] = classes[np.argmax(scores, axis=2)]
+    return out
+
+
+def _train_sgd(batches, classes, normalization, epochs, learning_rate, l2, gradient, negative):
+    passes = epochs + (classes is None)
+    if not callable(batches):
+        if passes > 1 and iter(batches) is batches:
+            raise TypeError('batches is a one-shot iterator but is read %d times. Pass a list or a callable returning new batches for every pass.' % passes)
+        iterable = batches
+        batches = lambda: iterable
+
+    if classes is None:
+        classes = np.unique(np.concatenate([np.unique(labels) for _, labels in batches()]))
+    classes = np.asarray(classes)
+
+    weights, bias = None, np.zeros(len(classes))
+    for _ in range(epochs):
+        for pixels, labels in batches():
+            X = _normalize(pixels, normalization)
+            if weights is None:
+                weights = np.zeros((X.shape[1], len(classes)))
+            target = np.where(labels[:, np.newaxis] == classes, 1.0, float(negative))
+
+            error = gradient(target, X @ weights + bias)
+            weights -= learning_rate * (X.T @ error / len(X) + l2 * weights)
+            bias -= learning_rate * error.mean(axis=0)
+    if weights is None:
+        raise ValueError('No batches to train on.')
+    return _fuse_normalization(weights, bias, classes, normalization)
+
+
+def _normalize(pixels, normalization):
+    X = pixels.astype(np.float64)
+    if normalization is not None:
+        shift, scale = normalization
+        X = (X - shift) * scale
+    return X
+
+
+def _fuse_normalization(weights, bias, classes, normalization):
+    # Fold (X - shift) * scale into the model so that inference works on raw pixels.
+    if normalization is not None:
+        shift, scale = normalization
+        weights = weights * scale[:, np.newaxis]
+        bias = bias - shift @ weights
+    return {'weights': weights.astype(np.float32), 'bias': bias.astype(np.float32), 'classes': classes}
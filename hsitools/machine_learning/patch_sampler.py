@@ -0,0 +1,99 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from .annotate_hspixels import annotate_hspixels_list
+
+
+def sample_patches(hsi: np.array, coordinates_list: list, label_list: list, patch_size: int=9, batch_size: int=64, n_batches: int=None,
+                   balance: bool=True, flip: bool=True, band_shift: int=0, brightness_range: tuple=None, n_workers: int=None, prefetch: int=4, seed: int=None):
+    '''
+    Generate batches of spatial-spectral patches around annotated pixels for training.
+
+    Patches are gathered from a strided window view of hsi, so only the sampled patches are read,
+    which also works with a memory-mapped image from nh9_to_memmap().
+    Batches are assembled and augmented on worker threads ahead of consumption.
+
+    Parameters:
+        hsi (np.array): Hyperspectral image (height, width, band).
+        coordinates_list (list of np.array): List of pixel coordinates (number of data, 2) as [row, column], one array per class,
+            e.g. np.argwhere(mask_img == 255).
+        label_list (list of int): List of annotation labels corresponding to each coordinate array.
+        patch_size (int): Size of the square patches. Must be odd. Default is 9.
+        batch_size (int): Number of patches per batch. Default is 64.
+        n_batches (int, optional): Number of batches to generate. If None, batches are generated endlessly.
+        balance (bool): If True, every class is sampled with the same probability. Otherwise every pixel is. Default is True.
+        flip (bool): Whether to randomly flip patches vertically and horizontally. Default is True.
+        band_shift (int): Maximum random shift of the spectra along the band axis. Default is 0 (no shift).
+        brightness_range (tuple, optional): (min, max) range of a random brightness scaling per patch. Default is None (no scaling).
+        n_workers (int, optional): Number of worker threads. If None, the number of CPUs is used.
+        prefetch (int): Number of batches prepared in advance. Default is 4.
+        seed (int, optional): Seed of the sampling and augmentation.
+
+    Yields:
+        tuple: Patches (batch_size, patch_size, patch_size, band) of dtype float32 and their labels (batch_size,).
+    '''
+    half = patch_size // 2
+    height, width = hsi.shape[:2]
+    windows = np.lib.stride_tricks.sliding_window_view(hsi, (patch_size, patch_size), axis=(0, 1))
+
+    labels_list = annotate_hspixels_list(coordinates_list, label_list)
+    coordinates, labels = [], []
+    for class_coordinates, class_labels in zip(coordinates_list, labels_list):
+        class_coordinates = np.asarray(class_coordinates).reshape(-1, 2)
+        inside = ((class_coordinates[:, 0] >= half) & (class_coordinates[:, 0] < height - half)
+                  & (class_coordinates[:, 1] >= half) & (class_coordinates[:, 1] < width - half))
+        if inside.any():
+            coordinates.append(class_coordinates[inside] - half)
+            labels.append(class_labels[inside])
+    if len(coordinates) == 0:
+        raise ValueError('No annotated pixel is far enough from the image border to extract a patch.')
+    class_sizes = np.array([len(c) for c in coordinates])
+    class_offsets = np.cumsum(class_sizes) - class_sizes
+    coordinates, labels = np.concatenate(coordinates), np.concatenate(labels)
+
+    def make_batch(seed_sequence):
+        rng = np.random.default_rng(seed_sequence)
+        if balance:
+            classes = rng.integers(0, len(class_sizes), batch_size)
+            index = class_offsets[classes] + (rng.random(batch_size) * class_sizes[classes]).astype(np.intp)
+        else:
+            index = rng.integers(0, len(labels), batch_size)
+        top_left, batch_labels = coordinates[index], labels[index]
+
+        patches = windows[top_left[:, 0], top_left[:, 1]].transpose(0, 2, 3, 1).astype(np.float32)
+        return _augment(patches, rng, flip, band_shift, brightness_range), batch_labels
+
+    seed_sequence = np.random.SeedSequence(seed)
+    executor = ThreadPoolExecutor(max_workers=n_workers or os.cpu_count())
+    pending = deque()
+    submitted = 0
+    try:
+        while True:
+            while len(pending) < prefetch and (n_batches is None or submitted < n_batches):
+                pending.append(executor.submit(make_batch, seed_sequence.spawn(1)[0]))
+                submitted += 1
+            if len(pending) == 0:
+                break
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
+
+
+def _augment(patches, rng, flip, band_shift, brightness_range):
+    n = len(patches)
+    if flip:
+        vertical = rng.random(n) < 0.5
+        patches[vertical] = patches[vertical, ::-1]
+        horizontal = rng.random(n) < 0.5
+        patches[horizontal] = patches[horizontal, :, ::-1]
+    if band_shift > 0:
+        shift = rng.integers(-band_shift, band_shift + 1, n)
+        band_index = np.clip(np.arange(patches.shape[3]) - shift[:, np.newaxis], 0, patches.shape[3] - 1)
+        patches = np.take_along_axis(patches, band_index[:, np.newaxis, np.newaxis, :], axis=3)
+    if brightness_range is not None:
+        patches *= rng.uniform(brightness_range[0], brightness_range[1], n).astype(np.float32)[:, np.newaxis, np.newaxis, np.newaxis]
+    return patches
@@ -0,0 +1 @@
+from .drift import capture_fingerprint, fingerprint_nh9_file, update_fingerprint_index, load_fingerprint_index, drift_distance, control_limits
\ No newline at end of file
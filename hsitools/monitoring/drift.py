@@ -0,0 +1,266 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from ..convert.nh9_to_array import nh9_to_memmap
+
+FINGERPRINT_KEYS = ('count', 'mean', 'std', 'signature', 'thumbnail', 'histogram')
+
+SETTING_KEYS = ('height', 'width', 'spectral_dimension', 'signature_bands', 'thumbnail_shape', 'bins', 'value_range', 'spatial_step')
+
+METRICS = ('sam', 'euclidean', 'zscore', 'thumbnail', 'histogram')
+
+
+def capture_fingerprint(hsi: np.array, signature_bands: int=16, thumbnail_shape: tuple=(8, 8), bins: int=64, value_range: tuple=(0, 4096),
+                        spatial_step: int=1, chunk_rows: int=16):
+    '''
+    Compute a compact fingerprint of a hyperspectral image (HSI) in a single streaming pass over its rows.
+
+    The bands are averaged into signature_bands contiguous groups for the signature, the thumbnail and the histograms,
+    so a fingerprint takes a few kilobytes whatever the size of the image.
+
+    Parameters:
+        hsi (np.array): Hyperspectral image (height, width, band), e.g. a memory-mapped image from nh9_to_memmap().
+        signature_bands (int): Number of band groups of the downsampled spectral signature. Default is 16.
+        thumbnail_shape (tuple): (rows, columns) of the grid of the spatial thumbnail. Cells without pixels are zero. Default is (8, 8).
+        bins (int): Number of intensity bins of the histograms. Default is 64.
+        value_range (tuple): (min, max) intensity range of the histograms. Default is (0, 4096) for 12-bit data.
+        spatial_step (int): Pixel stride used to subsample the image. Default is 1.
+        chunk_rows (int): Number of rows read at once. Default is 16.
+
+    Returns:
+        dict: 'count' (number of pixels), per-band 'mean' and 'std' (band,), 'signature' (signature_bands,),
+            'thumbnail' (rows, columns, signature_bands) and 'histogram' (signature_bands, bins).
+    '''
+    hsi = hsi[::spatial_step, ::spatial_step]
+    height, width, band_num = hsi.shape
+    signature_bands = min(signature_bands, band_num)
+
+    group = np.arange(band_num) * signature_bands // band_num
+    group_matrix = np.zeros((band_num, signature_bands))
+    group_matrix[np.arange(band_num), group] = 1 / np.bincount(group)[group]
+    grid_rows = np.arange(height) * thumbnail_shape[0] // height
+    # Cells get no pixels when the image is smaller than the grid. They are left at zero.
+    grid_columns = np.arange(width) * thumbnail_shape[1] // width
+    filled_columns = np.unique(grid_columns)
+    column_starts = np.searchsorted(grid_columns, filled_columns)
+
+    low, high = value_range
+    scale = bins / (high - low)
+    bin_offset = np.arange(signature_bands) * bins
+
+    total, square_total = np.zeros(band_num), np.zeros(band_num)
+    thumbnail = np.zeros(thumbnail_shape + (signature_bands,))
+    histogram = np.zeros(signature_bands * bins, dtype=np.int64)
+    for start in range(0, height, chunk_rows):
+        X = hsi[start:start + chunk_rows].reshape(-1, band_num).astype(np.float64)
+        total += X.sum(axis=0)
+        square_total += np.einsum('ij,ij->j', X, X)
+
+        # Group means of every pixel feed both the thumbnail and the histograms.
+        Y = X @ group_matrix
+        column_sums = np.add.reduceat(Y.reshape(-1, width, signature_bands), column_starts, axis=1)
+        np.add.at(thumbnail, (grid_rows[start:start + chunk_rows, np.newaxis], filled_columns), column_sums)
+        bin_index = np.clip(((Y - low) * scale).astype(np.intp), 0, bins - 1)
+        histogram += np.bincount((bin_index + bin_offset).ravel(), minlength=signature_bands * bins)
+
+    count = height * width
+    mean = total / count
+    pixels_per_cell = np.outer(np.bincount(grid_rows, minlength=thumbnail_shape[0]),
+                               np.bincount(grid_columns, minlength=thumbnail_shape[1]))
+    return {'count': count,
+            'mean': mean,
+            'std': np.sqrt(np.maximum(square_total / count - mean ** 2, 0)),
+            'signature': mean @ group_matrix,
+            'thumbnail': thumbnail / np.maximum(pixels_per_cell, 1)[:, :, np.newaxis],
+            'histogram': histogram.reshape(signature_bands, bins)}
+
+
+def fingerprint_nh9_file(file_path: str, height=1080, width=2048, spectral_dimension=151, **kwargs):
+    '''
+    Compute the fingerprint of an NH9 file without loading the whole file into memory.
+
+    Parameters:
+        file_path (str): Path to the hyperspectral image file.
+        height (int): Height of the image.
+        width (int): Width of the image.
+        spectral_dimension (int): Number of spectral dimensions.
+        **kwargs: Settings passed to capture_fingerprint().
+
+    Returns:
+        dict: Fingerprint from capture_fingerprint().
+    '''
+    return capture_fingerprint(nh9_to_memmap(file_path, height, width, spectral_dimension), **kwargs)
+
+
+def update_fingerprint_index(index_path: str, file_paths: list, height=1080, width=2048, spectral_dimension=151, signature_bands: int=16,
+                             thumbnail_shape: tuple=(8, 8), bins: int=64, value_range: tuple=(0, 4096), spatial_step: int=1, n_jobs: int=None):
+    '''
+    Create or update an index file holding the fingerprints of a sequence of NH9 captures.
+
+    Fingerprints of files whose size and modification time did not change since the last update are reused,
+    so only new or modified captures are read. The index is written atomically as an .npz file.
+
+    Parameters:
+        index_path (str): Path to the index file (.npz).
+        file_paths (list of str): Paths to the NH9 files in capture order. The index lists exactly these files.
+        height (int): Height of the images.
+        width (int): Width of the images.
+        spectral_dimension (int): Number of spectral dimensions.
+        signature_bands (int): Number of band groups of the downsampled spectral signature. Default is 16.
+        thumbnail_shape (tuple): (rows, columns) of the grid of the spatial thumbnail. Default is (8, 8).
+        bins (int): Number of intensity bins of the histograms. Default is 64.
+        value_range (tuple): (min, max) intensity range of the histograms. Default is (0, 4096).
+        spatial_step (int): Pixel stride used to subsample the images. Default is 1.
+        n_jobs (int, optional): Number of files fingerprinted in parallel. If None, the number of CPUs is used.
+
+    Returns:
+        dict: The updated index. See load_fingerprint_index().
+    '''
+    settings = {'height': height, 'width': width, 'spectral_dimension': spectral_dimension, 'signature_bands': signature_bands, 'thumbnail_shape': tuple(thumbnail_shape), 'bins': bins,
+                'value_range': tuple(value_range), 'spatial_step': spatial_step}
+    file_paths = [os.path.abspath(file_path) for file_path in file_paths]
+    stats = [os.stat(file_path) for file_path in file_paths]
+    mtimes = np.array([stat.st_mtime for stat in stats], dtype=np.float64)
+    sizes = np.array([stat.st_size for stat in stats], dtype=np.int64)
+
+    known = {}
+    if os.path.exists(index_path):
+        index = load_fingerprint_index(index_path)
+        if all(key in index and np.array_equal(index[key], settings[key]) for key in SETTING_KEYS):
+            for i, file_path in enumerate(index['file_paths']):
+                known[file_path] = (index['mtimes'][i], index['sizes'][i], {key: index[key][i] for key in FINGERPRINT_KEYS})
+
+    fingerprints = [None] * len(file_paths)
+    outdated = []
+    for i, file_path in enumerate(file_paths):
+        entry = known.get(file_path)
+        if entry is not None and entry[0] == mtimes[i] and entry[1] == sizes[i]:
+            fingerprints[i] = entry[2]
+        else:
+            outdated.append(i)
+
+    def fingerprint(i):
+        fingerprints[i] = fingerprint_nh9_file(file_paths[i], **settings)
+
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as executor:
+        list(executor.map(fingerprint, outdated))
+
+    index = {'file_paths': np.array(file_paths, dtype=str), 'mtimes': mtimes, 'sizes': sizes}
+    index.update({key: np.array(settings[key]) for key in SETTING_KEYS})
+    if fingerprints:
+        index.update({key: np.stack([np.asarray(f[key]) for f in fingerprints]) for key in FINGERPRINT_KEYS})
+    else:
+        index.update(_empty_fingerprints(spectral_dimension, signature_bands, thumbnail_shape, bins))
+
+    temporary_path = index_path + '.tmp'
+    with open(temporary_path, 'wb') as f:
+        np.savez(f, **index)
+    os.replace(temporary_path, index_path)
+    return index
+
+
+def load_fingerprint_index(index_path: str):
+    '''
+    Load an index file written by update_fingerprint_index().
+
+    Parameters:
+        index_path (str): Path to the index file (.npz).
+
+    Returns:
+        dict: 'file_paths', 'mtimes' and 'sizes' of the captures, the fingerprint settings,
+            and the fingerprints stacked along the first axis (one entry per capture).
+    '''
+    with np.load(index_path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def drift_distance(index: dict, baseline=0, metric: str='sam'):
+    '''
+    Compute the distance of every capture of an index to a baseline fingerprint.
+
+    Parameters:
+        index (dict): Index from update_fingerprint_index() or load_fingerprint_index().
+        baseline (int, slice, list or dict): Entry of the index, several entries averaged together, or a fingerprint from capture_fingerprint().
+            Default is 0 (the first capture).
+        metric (str): Distance measure. Default is 'sam'.
+            'sam': spectral angle between the mean spectra in radians
+            'euclidean': distance between the mean spectra relative to the norm of the baseline
+            'zscore': root mean square of the mean shift of each band in units of the baseline standard deviation
+            'thumbnail': distance between the thumbnails relative to the norm of the baseline, sensitive to scene changes
+            'histogram': Hellinger distance between the histograms averaged over the band groups
+
+    Returns:
+        np.array: Distances (number of captures,).
+    '''
+    if metric not in METRICS:
+        raise ValueError('metric must be one of %s' % (METRICS,))
+    if len(index['mean']) == 0:
+        return np.zeros(0)
+    if not isinstance(baseline, dict):
+        selection = index['mean'][baseline]
+        baseline = {key: index[key][baseline] if selection.ndim == 1 else index[key][baseline].mean(axis=0) for key in FINGERPRINT_KEYS}
+
+    if metric == 'sam':
+        mean, reference = index['mean'], baseline['mean']
+        cosine = mean @ reference / np.maximum(np.linalg.norm(mean, axis=1) * np.linalg.norm(reference), 1e-12)
+        return np.arccos(np.clip(cosine, -1, 1))
+    if metric == 'euclidean':
+        return np.linalg.norm(index['mean'] - baseline['mean'], axis=1) / max(np.linalg.norm(baseline['mean']), 1e-12)
+    if metric == 'zscore':
+        return np.sqrt(np.mean(((index['mean'] - baseline['mean']) / np.maximum(baseline['std'], 1e-12)) ** 2, axis=1))
+    if metric == 'thumbnail':
+        thumbnail = index['thumbnail'].reshape(len(index['thumbnail']), -1)
+        reference = np.ravel(baseline['thumbnail'])
+        return np.linalg.norm(thumbnail - reference, axis=1) / max(np.linalg.norm(reference), 1e-12)
+
+    histogram = index['histogram'] / np.maximum(index['histogram'].sum(axis=2, keepdims=True), 1)
+    reference = baseline['histogram'] / np.maximum(baseline['histogram'].sum(axis=1, keepdims=True), 1)
+    hellinger = np.sqrt(np.maximum(1 - np.sum(np.sqrt(histogram * reference), axis=2), 0))
+    return hellinger.mean(axis=1)
+
+
+def _empty_fingerprints(spectral_dimension, signature_bands, thumbnail_shape, bins):
+    signature_bands = min(signature_bands, spectral_dimension)
+    return {'count': np.zeros(0, dtype=np.int64),
+            'mean': np.zeros((0, spectral_dimension)),
+            'std': np.zeros((0, spectral_dimension)),
+            'signature': np.zeros((0, signature_bands)),
+            'thumbnail': np.zeros((0,) + tuple(thumbnail_shape) + (signature_bands,)),
+            'histogram': np.zeros((0, signature_bands, bins), dtype=np.int64)}
+
+
+def control_limits(values: np.array, window: int=50, n_sigma: float=3, min_periods: int=5):
+    '''
+    Compute rolling control limits of a drift series and flag the captures outside them.
+
+    The limits of each capture are computed from the preceding window captures only,
+    so a sudden change is flagged at the capture where it occurs.
+
+    Parameters:
+        values (np.array): Series of values in capture order, e.g. from drift_distance().
+        window (int): Number of preceding captures used for the limits. Default is 50.
+        n_sigma (float): Width of the limits in standard deviations. Default is 3.
+        min_periods (int): Minimum number of preceding captures required for limits. Earlier captures get NaN limits and are not flagged. Default is 5.
+
+    Returns:
+        dict: 'center', 'lower' and 'upper' limits (number of captures,) and the boolean 'out_of_control' flags.
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    cumulative = np.concatenate([[0], np.cumsum(values)])
+    square_cumulative = np.concatenate([[0], np.cumsum(values ** 2)])
+
+    end = np.arange(len(values))
+    start = np.maximum(end - window, 0)
+    n = end - start
+    valid = n >= max(min_periods, 2)
+    n_safe = np.maximum(n, 1)
+
+    center = (cumulative[end] - cumulative[start]) / n_safe
+    variance = (square_cumulative[end] - square_cumulative[start] - n * center ** 2) / np.maximum(n - 1, 1)
+    sigma = np.sqrt(np.maximum(variance, 0))
+    center = np.where(valid, center, np.nan)
+    lower = center - n_sigma * sigma
+    upper = center + n_sigma * sigma
+    out_of_control = valid & ((values < lower) | (values > upper))
+    return {'center': center, 'lower': lower, 'upper': upper, 'out_of_control': out_of_control}
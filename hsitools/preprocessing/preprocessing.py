@@ -1,13 +1,16 @@
 import numpy as np
 
-def min_max(X: np.array, X_train: np.array=None):
+from ..utils.buffer_pool import prepare_output
+
+def min_max(X: np.array, X_train: np.array=None, out: np.array=None, dtype=np.float32):
     '''
     Normalize the input hyperspectral pixels using min-max scaling.
 
     Parameters:
         X (np.array): Input array of hyperspectral pixels to be normalized.
         X_train (np.array, optional): If provided, the minimum and maximum values will be computed based on this array. Default is None.
-
+        out (np.array, optional): Output array of the same shape as X. Must be floating point. A floating-point X itself can be passed to normalize in place. Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
     Returns:
         np.array: Normalized array.
     '''
@@ -17,17 +20,17 @@ def min_max(X: np.array, X_train: np.array=None):
     else:
         min_vals = np.min(X)
         max_vals = np.max(X)
-    X = (X - min_vals) / (max_vals - min_vals)
-    return X
+    return _affine(X, min_vals, max_vals - min_vals, out, dtype)
 
-def band_wise_min_max(X: np.array, X_train: np.array=None):
+def band_wise_min_max(X: np.array, X_train: np.array=None, out: np.array=None, dtype=np.float32):
     '''
     Normalize the input hyperspectral pixels band-wise using min-max scaling.
 
     Parameters:
         X (np.array): Input array of hyperspectral pixels to be normalized.
         X_train (np.array, optional): If provided, the minimum and maximum values for each band will be computed based on this array. Default is None.
-
+        out (np.array, optional): Output array of the same shape as X. Must be floating point. A floating-point X itself can be passed to normalize in place. Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
     Returns:
         np.array: Normalized array.
     '''
@@ -37,17 +40,17 @@ def band_wise_min_max(X: np.array, X_train: np.array=None):
     else:
         min_vals = np.min(X, axis=0)
         max_vals = np.max(X, axis=0)
-    X = (X - min_vals) / (max_vals - min_vals)
-    return X
+    return _affine(X, min_vals, max_vals - min_vals, out, dtype)
 
-def std(X: np.array, X_train: np.array=None):
+def std(X: np.array, X_train: np.array=None, out: np.array=None, dtype=np.float32):
     '''
     Standardize the input hyperspectral pixels by subtracting the mean and dividing by the standard deviation.
 
     Parameters:
         X (np.array): Input array of hyperspectral pixels to be standardized.
         X_train (np.array, optional): If provided, the mean and standard deviation will be computed based on this array. Default is None.
-
+        out (np.array, optional): Output array of the same shape as X. Must be floating point. A floating-point X itself can be passed to normalize in place. Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
     Returns:
         np.array: Standardized array.
     '''
@@ -57,17 +60,17 @@ def std(X: np.array, X_train: np.array=None):
     else:
         mean_vals = np.mean(X)
         std_vals = np.std(X)
-    X = (X - mean_vals) / std_vals
-    return X
+    return _affine(X, mean_vals, std_vals, out, dtype)
 
-def band_wise_std(X: np.array, X_train: np.array=None):
+def band_wise_std(X: np.array, X_train: np.array=None, out: np.array=None, dtype=np.float32):
     '''
     Standardize the input hyperspectral pixels band-wise by subtracting the mean and dividing by the standard deviation of each band.
 
     Parameters:
         X (np.array): Input array of hyperspectral pixels to be standardized.
         X_train (np.array, optional): If provided, the mean and standard deviation for each band will be computed based on this array. Default is None.
-
+        out (np.array, optional): Output array of the same shape as X. Must be floating point. A floating-point X itself can be passed to normalize in place. Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
     Returns:
         np.array: Standardized array.
     '''
@@ -77,56 +80,55 @@ def band_wise_std(X: np.array, X_train: np.array=None):
     else:
         mean_vals = np.mean(X, axis=0)
         std_vals = np.std(X, axis=0)
-    X = (X - mean_vals) / std_vals
+    return _affine(X, mean_vals, std_vals, out, dtype)
 
-def instance_norm(X: np.array):
+def instance_norm(X: np.array, out: np.array=None, dtype=np.float32):
     '''
     Normalize the input hyperspectral pixels instance-wise using instance normalization.
 
     Parameters:
         X (np.array): Input array of hyperspectral pixels to be normalized.
-
+        out (np.array, optional): Output array of the same shape as X. Must be floating point. A floating-point X itself can be passed to normalize in place. Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
     Returns:
         np.array: Normalized array.
     '''
     mean_vals = np.mean(X, axis=1, keepdims=True)
     std_vals = np.std(X, axis=1, keepdims=True)
-    X_norm = (X - mean_vals) / std_vals
-    return X_norm
+    return _affine(X, mean_vals, std_vals, out, dtype)
 
-def instance_norm_min_max(X: np.array):
+def instance_norm_min_max(X: np.array, out: np.array=None, dtype=np.float32):
     '''
     Normalize the input hyperspectral pixels instance-wise using min-max scaling.
 
     Parameters:
         X (np.array): Input array of hyperspectral pixels to be normalized.
-
+        out (np.array, optional): Output array of the same shape as X. Must be floating point. A floating-point X itself can be passed to normalize in place. Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
     Returns:
         np.array: Normalized array.
     '''
     min_vals = np.min(X, axis=1, keepdims=True)
     max_vals = np.max(X, axis=1, keepdims=True)
-    X_norm = (X - min_vals) / (max_vals - min_vals)
-    return X_norm
+    return _affine(X, min_vals, max_vals - min_vals, out, dtype)
 
-def zero_wavelength(X: np.array, chosen_band: int=60):
+def zero_wavelength(X: np.array, chosen_band: int=60, out: np.array=None, dtype=np.float32):
     '''
     Apply zero-wavelength correction to the input hyperspectral pixels.
 
     Parameters:
         X (np.array): Input array of hyperspectral pixels to be corrected.
         chosen_band (int, optional): Index of the band to be set to zero wavelength. Default is 60.
-
+        out (np.array, optional): Output array of the same shape as X. Must be floating point. A floating-point X itself can be passed to normalize in place. Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
     Returns:
         np.array: Corrected array.
     '''
-    chosen_X = X[: , chosen_band]
-    exted_chosen_X = np.repeat(chosen_X[:, np.newaxis], 151, axis=1)
-    
-    X_norm = X - exted_chosen_X
-    return X_norm
+    out = _prepare_float_output(out, X.shape, dtype)
+    np.subtract(X, X[:, chosen_band:chosen_band + 1], out=out, dtype=np.float64, casting='unsafe')
+    return out
 
-def residual_img(X: np.array, chosen_band: int=60):
+def residual_img(X: np.array, chosen_band: int=60, out: np.array=None, dtype=np.float32):
     '''
     Apply residual image correction to the input hyperspectral pixels.
 
@@ -135,22 +137,20 @@ def residual_img(X: np.array, chosen_band: int=60):
     Parameters:
         X (np.array): Input array of hyperspectral pixels to be corrected.
         chosen_band (int, optional): Index of the band used for scaling. Default is 60.
-
+        out (np.array, optional): Output array of the same shape as X. Must be floating point. A floating-point X itself can be passed to normalize in place. Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
     Returns:
         np.array: Corrected array.
     '''
-    chosen_X = X[: , chosen_band]
-    max_value = np.max(chosen_X)
-
-    band_X = X[:, chosen_band]
-    residual_band_X = max_value - band_X
-    residual_X = X + np.repeat(residual_band_X[:, np.newaxis], 151, axis=1)
+    out = _prepare_float_output(out, X.shape, dtype)
+    chosen_X = X[:, chosen_band:chosen_band + 1].astype(np.float64)
+    residual_band_X = np.max(chosen_X) - chosen_X
 
-    channel_mean = np.mean(residual_X, axis=0)
-    X_norm = residual_X - channel_mean
-    return X_norm
+    channel_mean = np.mean(X, axis=0, dtype=np.float64) + np.mean(residual_band_X)
+    np.add(X, residual_band_X - channel_mean, out=out, casting='unsafe')
+    return out
 
-def iarr(X: np.array, X_train: np.array):
+def iarr(X: np.array, X_train: np.array, out: np.array=None, dtype=np.float32):
     '''
     Apply Internal Average Relative reflectance (IARR) correction to the input hyperspectral pixels.
 
@@ -159,13 +159,14 @@ def iarr(X: np.array, X_train: np.array):
     Parameters:
         X (np.array): Input array of hyperspectral pixels to be corrected.
         X_train (np.array): Array of hyperspectral pixels representing the average spectrum over the entire scene.
-
+        out (np.array, optional): Output array of the same shape as X. Must be floating point. A floating-point X itself can be passed to normalize in place. Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
     Returns:
         np.array: Corrected array.
     '''
-    return X / np.mean(X_train)
+    return _affine(X, 0, np.mean(X_train), out, dtype)
 
-def first_derivative(X: np.array):
+def first_derivative(X: np.array, out: np.array=None, dtype=np.float32):
     '''
     Calculate the first derivative of the input hyperspectral pixels.
 
@@ -173,21 +174,19 @@ def first_derivative(X: np.array):
 
     Parameters:
         X (np.array): Input array of hyperspectral pixels.
+        out (np.array, optional): Output array of shape (number of data, band - 1). Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
 
     Returns:
         np.array: Array containing the first derivative of each spectrum.
     '''
-    X = X.astype(np.int32)
-    X_first_derivative = []
-    for index in range(X.shape[0]):
-        x = X[index]
-        x = x / 4096
-        x_first_derivative = x[1:] - x[:len(x) - 1]
-        X_first_derivative.append(x_first_derivative)
-    X_first_derivative = np.array(X_first_derivative)
-    return X_first_derivative
+    X = _integer_values(X)
+    out = prepare_output(out, (X.shape[0], X.shape[1] - 1), dtype)
+    np.subtract(X[:, 1:], X[:, :-1], out=out, dtype=np.float64, casting='unsafe')
+    out /= 4096
+    return out
 
-def second_derivative(X: np.array):
+def second_derivative(X: np.array, out: np.array=None, dtype=np.float32):
     '''
     Calculate the second derivative of the input hyperspectral pixels.
 
@@ -195,17 +194,62 @@ def second_derivative(X: np.array):
 
     Parameters:
         X (np.array): Input array of hyperspectral pixels.
+        out (np.array, optional): Output array of shape (number of data, band - 2). Default is None.
+        dtype (np.dtype, optional): Data type of the output when out is None. Default is np.float32.
 
     Returns:
         np.array: Array containing the second derivative of each spectrum.
     '''
-    X = X.astype(np.int32)
-    X_second_derivative = []
-    for index in range(X.shape[0]):
-        x = X[index]
-        x = x / 4096
-        x_first_derivative = x[1:] - x[:len(x) - 1]
-        x_second_derivative = x_first_derivative[1:] - x_first_derivative[:len(x_first_derivative) - 1]
-        X_second_derivative.append(x_second_derivative)
-    X_second_derivative = np.array(X_second_derivative)
-    return X_second_derivative
\ No newline at end of file
+    X = _integer_values(X)
+    out = prepare_output(out, (X.shape[0], X.shape[1] - 2), dtype)
+    np.subtract(X[:, 2:], X[:, 1:-1], out=out, dtype=np.float64, casting='unsafe')
+    out -= X[:, 1:-1]
+    out += X[:, :-2]
+    out /= 4096
+    return out
+
+def normalization_parameters(X_train: np.array, method: str='band_wise_std'):
+    '''
+    Compute the parameters of an affine normalization so that it can be fused into later computations.
+
+    The normalized pixels are (X - shift) * scale, which matches min_max(), band_wise_min_max(), std() and band_wise_std() with X_train.
+
+    Parameters:
+        X_train (np.array): Array of hyperspectral pixels the parameters are computed from. shape=(number of data, band)
+        method (str, optional): 'min_max', 'band_wise_min_max', 'std' or 'band_wise_std'. Default is 'band_wise_std'.
+
+    Returns:
+        tuple of np.array: shift and scale, each of shape (band,).
+    '''
+    band_num = X_train.shape[1]
+    if method == 'min_max':
+        shift, scale = np.min(X_train), 1 / (np.max(X_train) - np.min(X_train))
+    elif method == 'band_wise_min_max':
+        shift, scale = np.min(X_train, axis=0), 1 / (np.max(X_train, axis=0) - np.min(X_train, axis=0))
+    elif method == 'std':
+        shift, scale = np.mean(X_train), 1 / np.std(X_train)
+    elif method == 'band_wise_std':
+        shift, scale = np.mean(X_train, axis=0), 1 / np.std(X_train, axis=0)
+    else:
+        raise ValueError('Unknown normalization method: %s' % method)
+    return np.broadcast_to(shift, band_num).astype(np.float64), np.broadcast_to(scale, band_num).astype(np.float64)
+
+
+def _affine(X, shift, divisor, out, dtype):
+    # (X - shift) / divisor written directly into out and computed in its dtype. X itself can be used as out.
+    out = _prepare_float_output(out, X.shape, dtype)
+    np.subtract(X, shift, out=out, dtype=out.dtype, casting='unsafe')
+    np.divide(out, divisor, out=out, dtype=out.dtype, casting='unsafe')
+    return out
+
+def _prepare_float_output(out, shape, dtype):
+    out = prepare_output(out, shape, dtype)
+    if not np.issubdtype(out.dtype, np.floating):
+        raise TypeError('out must be a floating-point array, but has dtype %s.' % out.dtype)
+    return out
+
+def _integer_values(X):
+    # The derivatives are defined on the integer sensor values.
+    if np.issubdtype(X.dtype, np.integer):
+        return X
+    return np.trunc(X)
\ No newline at end of file
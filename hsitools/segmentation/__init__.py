@@ -0,0 +1 @@
+from .segment_regions import spectral_angle_map, normalized_difference_index, segment_regions, decode_region_mask, rle_to_flat_index
\ No newline at end of file
@@ -0,0 +1,100 @@
+import numpy as np
+
+from ..utils.optional_dependency import optional_import
+from ..utils.rle import rle_encode, rle_to_flat_index
+
+
+def spectral_angle_map(hsi: np.array, reference_spectrum: np.array, chunk_rows: int=128):
+    '''
+    Compute the spectral angle between every pixel of a hyperspectral image (HSI) and a reference spectrum.
+
+    Parameters:
+        hsi (np.array): Input hyperspectral image (height, width, band).
+        reference_spectrum (np.array): Reference spectrum (band,).
+        chunk_rows (int): Number of rows processed at once. Default is 128.
+
+    Returns:
+        np.array: Spectral angle map (height, width) in radians.
+    '''
+    reference = np.asarray(reference_spectrum, dtype=np.float32)
+    reference = reference / np.linalg.norm(reference)
+
+    angle_map = np.empty(hsi.shape[:2], dtype=np.float32)
+    for start in range(0, hsi.shape[0], chunk_rows):
+        chunk = hsi[start:start + chunk_rows].astype(np.float32)
+        norm = np.linalg.norm(chunk, axis=2)
+        cos = (chunk @ reference) / np.maximum(norm, 1e-12)
+        angle_map[start:start + chunk_rows] = np.arccos(np.clip(cos, -1, 1))
+    return angle_map
+
+
+def normalized_difference_index(hsi: np.array, band_a: int, band_b: int):
+    '''
+    Compute a normalized difference index (band_a - band_b) / (band_a + band_b) of a hyperspectral image (HSI).
+
+    Parameters:
+        hsi (np.array): Input hyperspectral image (height, width, band).
+        band_a (int): Index of the first band.
+        band_b (int): Index of the second band.
+
+    Returns:
+        np.array: Index map (height, width). Pixels where both bands are zero are set to 0.
+    '''
+    a = hsi[:, :, band_a].astype(np.float32)
+    b = hsi[:, :, band_b].astype(np.float32)
+    total = a + b
+    return np.divide(a - b, total, out=np.zeros_like(total), where=total != 0)
+
+
+def segment_regions(score_map: np.array, threshold: float, above: bool=True, min_area: int=1, max_area: int=None, connectivity: int=8):
+    '''
+    Threshold a score map and label its connected components as regions.
+
+    Parameters:
+        score_map (np.array): Score map (height, width), e.g. a band index or a spectral angle map.
+        threshold (float): Threshold applied to the score map.
+        above (bool): If True, pixels with score > threshold are foreground. Otherwise pixels with score < threshold. Default is True.
+        min_area (int): Minimum number of pixels of a region. Default is 1.
+        max_area (int, optional): Maximum number of pixels of a region. Default is None (no limit).
+        connectivity (int): Pixel connectivity, 4 or 8. Default is 8.
+
+    Returns:
+        dict: Region table with the following entries, one row per region.
+            'bbox' (np.array): Bounding boxes (n, 4). Format: [start_row, start_column, end_row, end_column]
+            'pixel_count' (np.array): Number of pixels of each region (n,).
+            'rle' (list of np.array): Run-length encoded masks inside each bounding box.
+                Each is an array (runs, 2) of [start, length] over the row-major flattened bounding box.
+    '''
+    cv2 = optional_import('cv2')
+    mask = (score_map > threshold) if above else (score_map < threshold)
+    n_labels, label_img, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=connectivity, ltype=cv2.CV_32S)
+
+    area = stats[1:, cv2.CC_STAT_AREA]
+    keep = area >= min_area
+    if max_area is not None:
+        keep &= area <= max_area
+    labels = np.flatnonzero(keep) + 1
+
+    left, top = stats[labels, cv2.CC_STAT_LEFT], stats[labels, cv2.CC_STAT_TOP]
+    bbox = np.stack([top, left, top + stats[labels, cv2.CC_STAT_HEIGHT], left + stats[labels, cv2.CC_STAT_WIDTH]], axis=1)
+
+    rle = [rle_encode(label_img[b[0]:b[2], b[1]:b[3]] == label) for label, b in zip(labels, bbox)]
+    return {'bbox': bbox, 'pixel_count': stats[labels, cv2.CC_STAT_AREA], 'rle': rle}
+
+
+def decode_region_mask(regions: dict, index: int):
+    '''
+    Decode the mask of one region inside its bounding box.
+
+    Parameters:
+        regions (dict): Region table from segment_regions().
+        index (int): Index of the region in the table.
+
+    Returns:
+        np.array: Boolean mask (bbox height, bbox width).
+    '''
+    bbox = regions['bbox'][index]
+    shape = (bbox[2] - bbox[0], bbox[3] - bbox[1])
+    mask = np.zeros(shape[0] * shape[1], dtype=bool)
+    mask[rle_to_flat_index(regions['rle'][index])] = True
+    return mask.reshape(shape)
@@ -0,0 +1 @@
+from .unmixing import endmembers_from_pixels, endmembers_from_annotations, unmix
\ No newline at end of file
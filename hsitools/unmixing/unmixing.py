@@ -0,0 +1,171 @@
+import numpy as np
+
+METHODS = ('ls', 'scls', 'nnls', 'fcls')
+
+
+def endmembers_from_pixels(hs_pixels_list: list):
+    '''
+    Compute endmember spectra as the average spectrum of each set of annotated pixels.
+
+    Parameters:
+        hs_pixels_list (list of np.array): List of hyperspectral pixel arrays, one per endmember.
+            Each array should have shape (number of data, band).
+
+    Returns:
+        np.array: Endmember spectra (number of endmembers, band).
+    '''
+    return np.stack([np.mean(hs_pixels, axis=0) for hs_pixels in hs_pixels_list]).astype(np.float32)
+
+
+def endmembers_from_annotations(hs_pixels: np.array, labels: np.array):
+    '''
+    Compute endmember spectra from annotated pixels, e.g. the output of annotate_hspixels_list().
+
+    Parameters:
+        hs_pixels (np.array): Hyperspectral pixels. shape=(number of data, band)
+        labels (np.array): Label of each pixel. shape=(number of data,)
+
+    Returns:
+        tuple: Endmember spectra (number of labels, band) and the sorted labels they correspond to.
+    '''
+    classes = np.unique(labels)
+    return endmembers_from_pixels([hs_pixels[labels == label] for label in classes]), classes
+
+
+def unmix(hsi: np.array, endmembers: np.array, method: str='fcls', max_iter: int=500, tol: float=1e-4, tile_pixels: int=131072, out: np.array=None):
+    '''
+    Estimate the abundance of each endmember in every pixel of a hyperspectral image (HSI).
+
+    All pixels of a tile are solved at once. 'ls' and 'scls' are closed-form,
+    'nnls' and 'fcls' use accelerated projected gradient on the normal equations starting from the closed-form solution
+    to find the support of each pixel, and then solve exactly on that support and check the optimality (KKT) conditions.
+
+    Parameters:
+        hsi (np.array): Hyperspectral image (height, width, band) or pixels (number of data, band).
+        endmembers (np.array): Endmember spectra (number of endmembers, band), e.g. from endmembers_from_pixels() or a spectral library.
+        method (str): Constraint of the solver. Default is 'fcls'.
+            'ls': unconstrained least squares
+            'scls': sum-to-one constrained least squares
+            'nnls': non-negative least squares
+            'fcls': fully constrained (non-negative and sum-to-one) least squares
+        max_iter (int): Maximum number of iterations of the iterative solvers. Default is 500.
+        tol (float): Tolerance on the projected gradient residual of the iterative solvers before the exact solve on the support. Default is 1e-4.
+        tile_pixels (int): Approximate number of pixels solved at once. Default is 131072.
+        out (np.array, optional): Output array (..., number of endmembers). If None, a float32 array is allocated.
+
+    Returns:
+        np.array: Abundances (height, width, number of endmembers) or (number of data, number of endmembers).
+    '''
+    if method not in METHODS:
+        raise ValueError('method must be one of %s' % (METHODS,))
+
+    E = np.asarray(endmembers, dtype=np.float64)
+    if out is None:
+        out = np.empty(hsi.shape[:-1] + (E.shape[0],), dtype=np.float32)
+
+    gram = E @ E.T
+    inv_gram = np.linalg.inv(gram)
+    step = 1 / np.linalg.eigvalsh(gram)[-1]
+    pixels_per_row = int(np.prod(hsi.shape[1:-1]))
+    tile_rows = max(tile_pixels // pixels_per_row, 1)
+
+    for start in range(0, hsi.shape[0], tile_rows):
+        tile = hsi[start:start + tile_rows]
+        y = tile.reshape(-1, tile.shape[-1]).astype(np.float64) @ E.T
+        abundance = _solve(y, gram, inv_gram, step, method, max_iter, tol)
+        out[start:start + tile_rows] = abundance.reshape(tile.shape[:-1] + (E.shape[0],))
+    return out
+
+
+def _solve(y, gram, inv_gram, step, method, max_iter, tol):
+    abundance = y @ inv_gram
+    if method in ('scls', 'fcls'):
+        ones = np.ones(gram.shape[0])
+        correction = inv_gram @ ones / (ones @ inv_gram @ ones)
+        abundance += (1 - abundance.sum(axis=1, keepdims=True)) * correction
+    if method in ('ls', 'scls'):
+        return abundance
+
+    project = _project_simplex if method == 'fcls' else (lambda a: np.maximum(a, 0))
+    abundance = project(abundance)
+
+    # Pixels whose projected gradient residual is below tol are dropped from the working set.
+    active = np.arange(len(y))
+    current, momentum, y_active = abundance.copy(), abundance.copy(), y
+    t = 1.0
+    for _ in range(max_iter):
+        previous = current
+        current = project(momentum - step * (momentum @ gram - y_active))
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        momentum = current + ((t - 1) / t_next) * (current - previous)
+        t = t_next
+
+        residual = np.max(np.abs(current - project(current - step * (current @ gram - y_active))), axis=1)
+        converged = residual < tol
+        if converged.any():
+            abundance[active[converged]] = current[converged]
+            keep = ~converged
+            active, current, momentum, y_active = active[keep], current[keep], momentum[keep], y_active[keep]
+            if len(active) == 0:
+                break
+    abundance[active] = current
+    return _refine_on_support(abundance, y, gram, method)
+
+
+def _refine_on_support(abundance, y, gram, method, tol=1e-9):
+    # Projected gradient converges slowly for similar endmembers, so solve exactly on the support of every pixel
+    # and keep the solution where the KKT conditions hold. Otherwise the support is updated as in an active-set method.
+    n_endmembers = gram.shape[0]
+    support = abundance > 0
+    pending = np.arange(len(y))
+    for _ in range(2 * n_endmembers):
+        patterns, inverse = np.unique(support[pending], axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        next_pending = []
+        for k, pattern in enumerate(patterns):
+            pixels = pending[inverse == k]
+            if method == 'fcls' and not pattern.any():
+                continue
+            solution = np.zeros((len(pixels), n_endmembers))
+            if pattern.any():
+                inv_gram = np.linalg.pinv(gram[np.ix_(pattern, pattern)])
+                restricted = y[np.ix_(pixels, pattern)] @ inv_gram
+                if method == 'fcls':
+                    ones = np.ones(pattern.sum())
+                    restricted += (1 - restricted.sum(axis=1, keepdims=True)) * (inv_gram @ ones / (ones @ inv_gram @ ones))
+                solution[:, pattern] = restricted
+
+            gradient = solution @ gram - y[pixels]
+            if method == 'fcls':
+                gradient -= gradient[:, pattern].mean(axis=1, keepdims=True)
+            margin = tol * np.maximum(np.abs(y[pixels]).max(axis=1), 1e-12)
+            primal = (solution[:, pattern] >= 0).all(axis=1)
+            dual = (gradient[:, ~pattern] >= -margin[:, np.newaxis]).all(axis=1)
+            solved = primal & dual
+            abundance[pixels[solved]] = solution[solved]
+
+            # Drop the most negative abundance, or add the most violating endmember.
+            unsolved = ~solved
+            new_support = np.broadcast_to(pattern, (unsolved.sum(), n_endmembers)).copy()
+            rows = np.arange(len(new_support))
+            infeasible = ~primal[unsolved]
+            masked = np.where(pattern, solution[unsolved], np.inf)
+            new_support[rows[infeasible], np.argmin(masked[infeasible], axis=1)] = False
+            masked = np.where(pattern, np.inf, gradient[unsolved])
+            new_support[rows[~infeasible], np.argmin(masked[~infeasible], axis=1)] = True
+            support[pixels[unsolved]] = new_support
+            next_pending.append(pixels[unsolved])
+        pending = np.concatenate(next_pending) if next_pending else pending[:0]
+        if len(pending) == 0:
+            break
+    return abundance
+
+
+def _project_simplex(abundance):
+    # Euclidean projection of every row onto the probability simplex.
+    sorted_abundance = -np.sort(-abundance, axis=1)
+    cumulative = np.cumsum(sorted_abundance, axis=1) - 1
+    index = np.arange(1, abundance.shape[1] + 1)
+    rho = np.count_nonzero(sorted_abundance - cumulative / index > 0, axis=1)
+    theta = cumulative[np.arange(abundance.shape[0]), rho - 1] / rho
+    return np.maximum(abundance - theta[:, np.newaxis], 0)
@@ -0,0 +1 @@
+from .buffer_pool import BufferPool
\ No newline at end of file
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class BufferPool:
+    '''
+    Pool of preallocated arrays reused across frames.
+
+    Pass the arrays as the out argument of the hsitools functions so that a processing loop
+    does not allocate new outputs for every frame.
+
+    Example:
+        pool = BufferPool()
+        for file_path in file_paths:
+            hsi = nh9_to_array(file_path)
+            rgb = hs_to_rgb(hsi, out=pool.get('rgb', (hsi.shape[0], hsi.shape[1], 3)))
+    '''
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name: str, shape: tuple, dtype=np.float32):
+        '''
+        Get the buffer registered under name, allocating it if it does not exist or its shape or dtype changed.
+
+        Parameters:
+            name (str): Name of the buffer.
+            shape (tuple): Shape of the buffer.
+            dtype (np.dtype): Data type of the buffer. Default is np.float32.
+
+        Returns:
+            np.array: Buffer with uninitialized contents.
+        '''
+        shape, dtype = tuple(shape), np.dtype(dtype)
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer
+
+    def clear(self):
+        '''
+        Release all buffers of the pool.
+        '''
+        self._buffers.clear()
+
+    @property
+    def nbytes(self):
+        '''
+        int: Total size of the buffers in bytes.
+        '''
+        return sum(buffer.nbytes for buffer in self._buffers.values())
+
+
+def prepare_output(out: np.array, shape: tuple, dtype=np.float32):
+    '''
+    Return out after checking its shape, or allocate a new array if out is None.
+
+    Parameters:
+        out (np.array): Output array given by the caller, or None.
+        shape (tuple): Expected shape of the output.
+        dtype (np.dtype): Data type of a newly allocated output. Default is np.float32.
+
+    Returns:
+        np.array: Output array.
+    '''
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != tuple(shape):
+        raise ValueError('out has shape %s, but %s is required.' % (out.shape, tuple(shape)))
+    return out
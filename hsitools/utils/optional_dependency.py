@@ -0,0 +1,23 @@
+import importlib
+
+EXTRAS = {'cv2': 'opencv'}
+
+
+def optional_import(module_name: str, required: bool=True):
+    '''
+    Import an optional dependency when it is first needed.
+
+    Parameters:
+        module_name (str): Name of the module, e.g. 'cv2'.
+        required (bool): If False, return None instead of raising when the module is not installed. Default is True.
+
+    Returns:
+        module: The imported module, or None if it is missing and not required.
+    '''
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as error:
+        if not required:
+            return None
+        raise ImportError("This function requires the optional dependency '%s'. Install it with: pip install hsitools[%s]"
+                          % (module_name, EXTRAS.get(module_name, 'all'))) from error
@@ -0,0 +1,32 @@
+import numpy as np
+
+
+def rle_encode(mask: np.array):
+    '''
+    Run-length encode a boolean mask over its row-major flattened pixels.
+
+    Parameters:
+        mask (np.array): Boolean mask.
+
+    Returns:
+        np.array: Runs (runs, 2) of [start, length] of dtype int32.
+    '''
+    flat = np.concatenate([[False], mask.ravel(), [False]])
+    changes = np.flatnonzero(flat[1:] != flat[:-1])
+    starts, ends = changes[::2], changes[1::2]
+    return np.stack([starts, ends - starts], axis=1).astype(np.int32)
+
+
+def rle_to_flat_index(rle: np.array):
+    '''
+    Convert a run-length encoded mask to flat indices.
+
+    Parameters:
+        rle (np.array): Runs (runs, 2) of [start, length].
+
+    Returns:
+        np.array: Flat indices of the foreground pixels.
+    '''
+    starts, lengths = rle[:, 0], rle[:, 1]
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.arange(lengths.sum()) + offsets
@@ -1 +1,2 @@
-from .plot_spectral_graph import plot_spectral_graph, plot_spectrals_graph, set_grath_spectralscale
\ No newline at end of file
+from .plot_spectral_graph import plot_spectral_graph, plot_spectrals_graph, set_grath_spectralscale
+from .plot_spectral_collection import summarize_spectra, plot_spectral_summaries, plot_spectral_lines, spectral_density, plot_spectral_density
\ No newline at end of file
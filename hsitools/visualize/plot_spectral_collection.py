@@ -0,0 +1,154 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.lines import Line2D
+
+
+def summarize_spectra(hs_pixels_list: list, chunk_size: int=65536):
+    '''
+    Compute the average and standard deviation spectrum of each set of hyperspectral pixels in one streaming pass.
+
+    Parameters:
+        hs_pixels_list (list of np.array): List of hyperspectral pixel data arrays. Each array has shape (number of data, band).
+        chunk_size (int): Number of pixels accumulated at once. Default is 65536.
+
+    Returns:
+        dict: 'mean' and 'std' (number of sets, band) and 'count' (number of sets,).
+    '''
+    means, stds, counts = [], [], []
+    for hs_pixels in hs_pixels_list:
+        total = np.zeros(hs_pixels.shape[1])
+        square_total = np.zeros(hs_pixels.shape[1])
+        for start in range(0, hs_pixels.shape[0], chunk_size):
+            chunk = hs_pixels[start:start + chunk_size].astype(np.float64)
+            total += chunk.sum(axis=0)
+            square_total += np.einsum('ij,ij->j', chunk, chunk)
+        count = max(hs_pixels.shape[0], 1)
+        mean = total / count
+        means.append(mean)
+        stds.append(np.sqrt(np.maximum(square_total / count - mean ** 2, 0)))
+        counts.append(hs_pixels.shape[0])
+    return {'mean': np.array(means), 'std': np.array(stds), 'count': np.array(counts)}
+
+
+def plot_spectral_summaries(summary: dict, ax: plt.Axes, wavelengths: np.array=None, plot_color_list: list=None, label_list: list=None, plot_std: bool=False):
+    '''
+    Plot the average spectra of a summary from summarize_spectra() as a single collection.
+
+    Parameters:
+        summary (dict): Summary from summarize_spectra().
+        ax (matplotlib.axes.Axes): Axes object to plot the graph on.
+        wavelengths (np.array, optional): Wavelength of each band used as the x-axis. If None, the band index is used.
+        plot_color_list (list of str or tuple, optional): List of colors for each curve. If None, the color cycle of ax is used.
+        label_list (list of str, optional): List of labels for each curve. If provided, a legend is added.
+        plot_std (bool, optional): Whether to plot the standard deviation as a shaded region around each curve. Default is False.
+
+    Returns:
+        matplotlib.axes.Axes: The same Axes object after plotting the graph.
+    '''
+    mean, std = summary['mean'], summary['std']
+    x = _x_values(wavelengths, mean.shape[1])
+    if plot_color_list is None or len(plot_color_list) == 0:
+        cycle = plt.rcParams['axes.prop_cycle'].by_key()['color']
+        plot_color_list = [cycle[i % len(cycle)] for i in range(len(mean))]
+
+    if plot_std:
+        polygons = [np.concatenate([np.column_stack([x, avg + sd]), np.column_stack([x[::-1], (avg - sd)[::-1]])]) for avg, sd in zip(mean, std)]
+        ax.add_collection(PolyCollection(polygons, facecolors=plot_color_list, edgecolors='none', alpha=0.3))
+
+    segments = np.stack([np.broadcast_to(x, mean.shape), mean], axis=2)
+    ax.add_collection(LineCollection(segments, colors=plot_color_list))
+    ax.autoscale_view()
+
+    if label_list is not None and len(label_list) > 0:
+        handles = [Line2D([], [], color=color, label=label) for color, label in zip(plot_color_list, label_list)]
+        ax.legend(handles=handles)
+    return ax
+
+
+def plot_spectral_lines(hs_pixels: np.array, ax: plt.Axes, wavelengths: np.array=None, max_lines: int=1000, plot_color: str=None, alpha: float=0.1, seed: int=None):
+    '''
+    Plot the raw spectra of many pixels as a single collection, decimated to at most max_lines randomly chosen pixels.
+
+    Parameters:
+        hs_pixels (np.array): Hyperspectral pixel data (number of data, band).
+        ax (matplotlib.axes.Axes): Axes object to plot the graph on.
+        wavelengths (np.array, optional): Wavelength of each band used as the x-axis. If None, the band index is used.
+        max_lines (int): Maximum number of spectra drawn. Default is 1000.
+        plot_color (str or tuple, optional): Color of the lines. If None, the first color of the color cycle is used.
+        alpha (float): Transparency of the lines. Default is 0.1.
+        seed (int, optional): Seed of the random decimation.
+
+    Returns:
+        matplotlib.axes.Axes: The same Axes object after plotting the graph.
+    '''
+    if hs_pixels.shape[0] > max_lines:
+        index = np.sort(np.random.default_rng(seed).choice(hs_pixels.shape[0], max_lines, replace=False))
+        hs_pixels = hs_pixels[index]
+    if plot_color is None:
+        plot_color = plt.rcParams['axes.prop_cycle'].by_key()['color'][0]
+
+    x = _x_values(wavelengths, hs_pixels.shape[1])
+    segments = np.stack([np.broadcast_to(x, hs_pixels.shape), hs_pixels.astype(np.float32)], axis=2)
+    ax.add_collection(LineCollection(segments, colors=plot_color, alpha=alpha))
+    ax.autoscale_view()
+    return ax
+
+
+def spectral_density(hs_pixels: np.array, bins: int=256, value_range: tuple=None, chunk_size: int=65536):
+    '''
+    Compute a 2-D histogram of band against intensity for a set of hyperspectral pixels.
+
+    Parameters:
+        hs_pixels (np.array): Hyperspectral pixel data (number of data, band).
+        bins (int): Number of intensity bins. Default is 256.
+        value_range (tuple, optional): (min, max) intensity range. If None, the range of hs_pixels is used.
+        chunk_size (int): Number of pixels accumulated at once. Default is 65536.
+
+    Returns:
+        dict: 'density' (bins, band) counts and 'value_range' of the intensity axis.
+    '''
+    band_num = hs_pixels.shape[1]
+    if value_range is None:
+        value_range = (float(np.min(hs_pixels)), float(np.max(hs_pixels)))
+    low, high = value_range
+    scale = bins / max(high - low, 1e-12)
+
+    density = np.zeros(bins * band_num, dtype=np.int64)
+    band_offset = np.arange(band_num) * bins
+    for start in range(0, hs_pixels.shape[0], chunk_size):
+        chunk = hs_pixels[start:start + chunk_size].astype(np.float32)
+        bin_index = np.clip(((chunk - low) * scale).astype(np.intp), 0, bins - 1)
+        density += np.bincount((bin_index + band_offset).ravel(), minlength=bins * band_num)
+    return {'density': density.reshape(band_num, bins).T, 'value_range': (low, high)}
+
+
+def plot_spectral_density(density: dict, ax: plt.Axes, wavelengths: np.array=None, log_scale: bool=True, cmap: str='viridis'):
+    '''
+    Plot a band-intensity density from spectral_density() as a heatmap.
+
+    The cost of drawing does not depend on the number of pixels the density was computed from.
+
+    Parameters:
+        density (dict): Density from spectral_density().
+        ax (matplotlib.axes.Axes): Axes object to plot the graph on.
+        wavelengths (np.array, optional): Wavelength of each band used as the x-axis. If None, the band index is used.
+        log_scale (bool): Whether to show the counts on a logarithmic scale. Default is True.
+        cmap (str): Colormap of the heatmap. Default is 'viridis'.
+
+    Returns:
+        matplotlib.axes.Axes: The same Axes object after plotting the graph.
+    '''
+    counts = density['density']
+    x = _x_values(wavelengths, counts.shape[1])
+    x_edges = np.concatenate([[x[0] - (x[1] - x[0]) / 2], (x[1:] + x[:-1]) / 2, [x[-1] + (x[-1] - x[-2]) / 2]]) if len(x) > 1 else np.array([x[0] - 0.5, x[0] + 0.5])
+    y_edges = np.linspace(density['value_range'][0], density['value_range'][1], counts.shape[0] + 1)
+    values = np.log1p(counts) if log_scale else counts
+    ax.pcolormesh(x_edges, y_edges, values, cmap=cmap, shading='flat')
+    return ax
+
+
+def _x_values(wavelengths, band_num):
+    if wavelengths is None:
+        return np.arange(band_num, dtype=np.float64)
+    return np.asarray(wavelengths, dtype=np.float64)
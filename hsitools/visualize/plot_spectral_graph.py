@@ -2,6 +2,8 @@ from typing import Union
 import numpy as np
 import matplotlib.pyplot as plt
 
+from .plot_spectral_collection import summarize_spectra, plot_spectral_summaries
+
 def plot_spectral_graph(hs_pixels: np.array, ax: plt.Axes, plot_color: Union[str, tuple] = None, label: str=None, plot_std: bool = False):
     '''
     Plot a spectral graph based on hyperspectral pixel data.
@@ -28,7 +30,7 @@ def plot_spectral_graph(hs_pixels: np.array, ax: plt.Axes, plot_color: Union[str
 
     return ax
 
-def plot_spectrals_graph(hs_pixels_list: list, ax: plt.Axes, plot_color_list: list=[], label_list: list=[], plot_std: bool=False):
+def plot_spectrals_graph(hs_pixels_list: list, ax: plt.Axes, plot_color_list: list=[], label_list: list=[], plot_std: bool=False, wavelengths: np.array=None):
     '''
     Plot spectral graphs for multiple sets of hyperspectral pixel data.
 
@@ -38,39 +40,34 @@ def plot_spectrals_graph(hs_pixels_list: list, ax: plt.Axes, plot_color_list: li
         plot_color_list (list of str or tuple): List of colors for each plotted curve. Each color can be specified as a string or a tuple.
         label_list (list of str, optional): List of labels for the plotted curves. If provided, each label will be associated with the corresponding set of pixels.
         plot_std (bool, optional): Whether to plot the standard deviation as a shaded region around the average curve for each set of pixels. Default is False.
+        wavelengths (np.array, optional): Wavelength of each band used as the x-axis. If None, the band index is used.
 
     Returns:
         matplotlib.axes.Axes: The same Axes object after plotting the graph.
     '''
-    if len(plot_color_list) == 0 & len(label_list) > 0:
-        for hs_pixels, label in zip(hs_pixels_list, label_list):
-            ax = plot_spectral_graph(hs_pixels, ax, label=label, plot_std=plot_std)
-    elif len(label_list) == 0 & len(plot_color_list) > 0:
-        for hs_pixels, plot_color in zip(hs_pixels_list, plot_color_list):
-            ax = plot_spectral_graph(hs_pixels, ax, plot_color=plot_color,  plot_std=plot_std)
-    elif len(plot_color_list) == 0 & len(label_list) == 0:
-        for hs_pixels in hs_pixels_list:
-            ax = plot_spectral_graph(hs_pixels, ax, plot_std=plot_std)
-    else:
-        for hs_pixels, plot_color, label in zip(hs_pixels_list, plot_color_list, label_list):
-            ax = plot_spectral_graph(hs_pixels, ax, plot_color=plot_color, label=label, plot_std=plot_std)
-    return ax
+    summary = summarize_spectra(hs_pixels_list)
+    return plot_spectral_summaries(summary, ax, plot_color_list=plot_color_list, label_list=label_list, plot_std=plot_std, wavelengths=wavelengths)
 
-def set_grath_spectralscale(ax, marks_number: int=8, spectral_start_end: np.array=np.array((350, 1150)), band_num: int=151):    
-    spectral_range = spectral_start_end[1] - spectral_start_end[0]
-    spectral_interval = int(spectral_range / marks_number)
-    band_interval = int(band_num / marks_number)
-
-    new_labels = []
-    new_values = []
-    wavelength = spectral_start_end[0]
+def set_grath_spectralscale(ax, marks_number: int=8, spectral_start_end: np.array=np.array((350, 1150)), band_num: int=151, wavelengths: np.array=None):
+    '''
+    Replace the band index ticks of the x-axis with wavelength labels.
 
-    for i in range(marks_number + 1):
-        new_labels.append(wavelength)
-        new_values.append(i * band_interval)
-        wavelength = wavelength + spectral_interval
+    Parameters:
+        ax (matplotlib.axes.Axes): Axes object whose x-axis is the band index.
+        marks_number (int): Number of intervals between the ticks. Default is 8.
+        spectral_start_end (np.array): First and last wavelength of the tick labels. Default is (350, 1150).
+        band_num (int): Number of bands. Ignored if wavelengths is given. Default is 151.
+        wavelengths (np.array, optional): Wavelength of each band. If None, a 5 nm grid of band_num bands starting at spectral_start_end[0] is assumed.
+            The ticks are placed at the band positions of their wavelengths, and ticks outside the bands are dropped.
 
+    Returns:
+        matplotlib.axes.Axes: The same Axes object.
+    '''
+    if wavelengths is None:
+        wavelengths = spectral_start_end[0] + 5 * np.arange(band_num)
+    new_labels = np.linspace(spectral_start_end[0], spectral_start_end[1], marks_number + 1)
+    new_labels = new_labels[(new_labels >= np.min(wavelengths)) & (new_labels <= np.max(wavelengths))]
+    new_values = np.interp(new_labels, wavelengths, np.arange(len(wavelengths)))
     ax.set_xticks(new_values)
-    ax.set_xticklabels(new_labels)
-
+    ax.set_xticklabels(['%g' % label for label in new_labels])
     return ax
\ No newline at end of file
@@ -10,11 +10,15 @@ VERSION = '0.1.60'
 PYTHON_REQUIRES = '>=3.8.18'
 
 INSTALL_REQUIRES = [
-    'matplotlib>=3.7.5',
-    'numpy>=1.24.4',
-    'opencv-python>=4.9.0.80'
+    'numpy>=1.24.4'
 ]
 
+EXTRAS_REQUIRE = {
+    'opencv': ['opencv-python>=4.9.0.80'],
+    'plot': ['matplotlib>=3.7.5'],
+}
+EXTRAS_REQUIRE['all'] = EXTRAS_REQUIRE['opencv'] + EXTRAS_REQUIRE['plot']
+
 with open('README.md', 'r') as fp:
     readme = fp.read()
 
@@ -27,5 +31,6 @@ setup(name=NAME,
       download_url=DOWNLOAD_URL,
       python_requires=PYTHON_REQUIRES,
       install_requires=INSTALL_REQUIRES,
+      extras_require=EXTRAS_REQUIRE,
       packages=find_packages(),
     )